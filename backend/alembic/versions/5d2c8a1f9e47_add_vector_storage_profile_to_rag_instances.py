@@ -0,0 +1,35 @@
+"""Add vector storage profile to rag_instances
+
+Revision ID: 5d2c8a1f9e47
+Revises: 33bb95ac221e
+Create Date: 2026-10-18 09:12:41.502113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2c8a1f9e47'
+down_revision: Union[str, Sequence[str], None] = '33bb95ac221e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing collections were created with Qdrant defaults, so backfill that profile
+    op.add_column('rag_instances', sa.Column('vector_quantization', sa.String(length=20), nullable=True, server_default='none'))
+    op.add_column('rag_instances', sa.Column('vectors_on_disk', sa.Boolean(), nullable=True, server_default=sa.false()))
+    op.add_column('rag_instances', sa.Column('hnsw_m', sa.Integer(), nullable=True, server_default='16'))
+    op.add_column('rag_instances', sa.Column('hnsw_ef_construct', sa.Integer(), nullable=True, server_default='100'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_instances', 'hnsw_ef_construct')
+    op.drop_column('rag_instances', 'hnsw_m')
+    op.drop_column('rag_instances', 'vectors_on_disk')
+    op.drop_column('rag_instances', 'vector_quantization')
@@ -0,0 +1,29 @@
+"""Add embedding_dimensions to rag_instances
+
+Revision ID: 8f3e6b2d4c10
+Revises: 5d2c8a1f9e47
+Create Date: 2026-10-18 10:03:17.884920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3e6b2d4c10'
+down_revision: Union[str, Sequence[str], None] = '5d2c8a1f9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL keeps existing RAGs on the model's full dimension count
+    op.add_column('rag_instances', sa.Column('embedding_dimensions', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_instances', 'embedding_dimensions')
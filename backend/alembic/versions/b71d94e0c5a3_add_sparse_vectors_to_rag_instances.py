@@ -0,0 +1,29 @@
+"""Add sparse_vectors to rag_instances
+
+Revision ID: b71d94e0c5a3
+Revises: 8f3e6b2d4c10
+Create Date: 2026-10-18 11:26:54.310472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d94e0c5a3'
+down_revision: Union[str, Sequence[str], None] = '8f3e6b2d4c10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Collections indexed before this change have no BM25 vectors
+    op.add_column('rag_instances', sa.Column('sparse_vectors', sa.Boolean(), nullable=True, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_instances', 'sparse_vectors')
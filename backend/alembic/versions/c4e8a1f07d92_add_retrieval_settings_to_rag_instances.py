@@ -0,0 +1,32 @@
+"""Add retrieval settings to rag_instances
+
+Revision ID: c4e8a1f07d92
+Revises: b71d94e0c5a3
+Create Date: 2026-10-18 13:02:17.845310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f07d92'
+down_revision: Union[str, Sequence[str], None] = 'b71d94e0c5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rag_instances', sa.Column('score_threshold', sa.Float(), nullable=True))
+    op.add_column('rag_instances', sa.Column('mmr_lambda', sa.Float(), nullable=True))
+    op.add_column('rag_instances', sa.Column('context_token_budget', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_instances', 'context_token_budget')
+    op.drop_column('rag_instances', 'mmr_lambda')
+    op.drop_column('rag_instances', 'score_threshold')
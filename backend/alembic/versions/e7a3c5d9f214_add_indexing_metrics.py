@@ -0,0 +1,31 @@
+"""Add indexing_metrics to documents and rag_instances
+
+Revision ID: e7a3c5d9f214
+Revises: d2f5b8c91e07
+Create Date: 2026-10-18 16:02:11.480552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c5d9f214'
+down_revision: Union[str, Sequence[str], None] = 'd2f5b8c91e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('indexing_metrics', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('rag_instances', sa.Column('indexing_metrics', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_instances', 'indexing_metrics')
+    op.drop_column('documents', 'indexing_metrics')
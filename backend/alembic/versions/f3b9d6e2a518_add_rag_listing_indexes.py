@@ -0,0 +1,30 @@
+"""Index rag_instances by owner and documents by RAG
+
+Revision ID: f3b9d6e2a518
+Revises: e7a3c5d9f214
+Create Date: 2026-10-18 17:24:39.215806
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d6e2a518'
+down_revision: Union[str, Sequence[str], None] = 'e7a3c5d9f214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_rag_instances_user_id_name_id', 'rag_instances', ['user_id', 'name', 'id'], unique=False)
+    op.create_index(op.f('ix_documents_rag_id'), 'documents', ['rag_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_documents_rag_id'), table_name='documents')
+    op.drop_index('ix_rag_instances_user_id_name_id', table_name='rag_instances')
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 import uvicorn
 import os
@@ -6,6 +7,7 @@ from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 
 from routes import auth, user, rag
+from db.supabase import async_engine
 
 load_dotenv()
 
@@ -16,7 +18,13 @@ PORT = int(os.getenv("PORT", "8000"))
 _origins_str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
 ALLOWED_ORIGINS = [o.strip() for o in _origins_str.split(",") if o.strip()] or ["http://localhost:3000", "http://127.0.0.1:3000"]
 
-app = FastAPI(title=APP_NAME, docs_url="/docs", redoc_url="/redoc", openapi_url="/openapi.json")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await async_engine.dispose()
+
+
+app = FastAPI(title=APP_NAME, docs_url="/docs", redoc_url="/redoc", openapi_url="/openapi.json", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
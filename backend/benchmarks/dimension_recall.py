@@ -0,0 +1,113 @@
+"""
+Estimate how much retrieval quality a RAG would lose with shortened embeddings.
+
+Reads a sample of chunks (with their full-size vectors) from an existing,
+full-dimension collection, embeds a set of queries once at full size, and
+compares top-k results at full size against top-k at each candidate size.
+text-embedding-3 vectors can be shortened by truncating and re-normalising,
+which is what the API's `dimensions` parameter returns, so no re-embedding of
+the corpus is needed.
+
+    cd backend
+    python -m benchmarks.dimension_recall --collection my_rag --dims 256 512 1024 1536
+    python -m benchmarks.dimension_recall --collection my_rag --queries-file questions.txt --k 5
+
+Without --queries-file, pseudo-queries are taken from the first sentence of
+randomly chosen sampled chunks.
+"""
+import argparse
+import random
+import re
+import sys
+from typing import List
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+from qdrant_client import QdrantClient
+
+from rag.indexing import EMBEDDING_MODEL, QDRANT_URL
+
+
+def load_sample(client: QdrantClient, collection: str, size: int):
+    texts, vectors, offset = [], [], None
+    while len(texts) < size:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=min(256, size - len(texts)),
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for p in points:
+            vector = p.vector.get("") if isinstance(p.vector, dict) else p.vector
+            if vector is None:
+                continue
+            texts.append((p.payload or {}).get("page_content", ""))
+            vectors.append(vector)
+        if offset is None:
+            break
+    return texts, np.asarray(vectors, dtype=np.float32)
+
+
+def pseudo_queries(texts: List[str], n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for text in rng.sample(texts, min(n, len(texts))):
+        sentence = re.split(r"(?<=[.!?])\s+", " ".join(text.split()))[0]
+        queries.append(sentence[:300])
+    return [q for q in queries if q]
+
+
+def shorten(vectors: np.ndarray, dims: int) -> np.ndarray:
+    cut = vectors[:, :dims]
+    norms = np.linalg.norm(cut, axis=1, keepdims=True)
+    return cut / np.where(norms == 0, 1, norms)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", required=True, help="full-dimension Qdrant collection to sample")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024, 1536])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=2000, help="chunks to read from the collection")
+    parser.add_argument("--queries", type=int, default=100, help="pseudo-queries when no file is given")
+    parser.add_argument("--queries-file", help="one query per line")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    client = QdrantClient(url=QDRANT_URL)
+    texts, corpus = load_sample(client, args.collection, args.sample)
+    if len(texts) <= args.k:
+        print(f"Only {len(texts)} chunks in {args.collection}; need more than k={args.k}", file=sys.stderr)
+        return 1
+    full_size = corpus.shape[1]
+
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = pseudo_queries(texts, args.queries, args.seed)
+
+    query_vectors = np.asarray(OpenAIEmbeddings(model=args.model).embed_documents(queries), dtype=np.float32)
+    if query_vectors.shape[1] != full_size:
+        print(f"{args.model} returns {query_vectors.shape[1]} dims but the collection stores {full_size}", file=sys.stderr)
+        return 1
+
+    truth = top_k(shorten(corpus, full_size), shorten(query_vectors, full_size), args.k)
+    print(f"collection={args.collection} chunks={len(texts)} queries={len(queries)} full_dims={full_size} k={args.k}")
+    print(f"{'dims':>6}  {'recall@k':>8}  {'memory':>7}")
+    for dims in sorted(d for d in args.dims if d < full_size):
+        found = top_k(shorten(corpus, dims), shorten(query_vectors, dims), args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        print(f"{dims:>6}  {recall:>8.3f}  {dims / full_size:>6.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Measure loader + splitter throughput per input format.
+
+Runs each file through the same path indexing uses (format sniffing, the
+registered loader, the chunk splitter) without embedding anything, and
+reports MB/s, sections/s and chunks/s. Synthetic .txt, .md and .docx files
+of --size-mb are generated unless files are given; PDFs must be given,
+since there is no PDF writer among the dependencies.
+
+    cd backend
+    python -m benchmarks.loader_throughput --size-mb 20
+    python -m benchmarks.loader_throughput --files manual.pdf notes.md --repeat 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from typing import List
+from xml.sax.saxutils import escape
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag.indexing import CHUNK_OVERLAP, CHUNK_SIZE
+from rag.ingest import iter_chunks
+from rag.loaders import detect_format, load_document
+
+PARAGRAPH = (
+    "Binary search halves the interval on every step, so a sorted array of n items "
+    "needs at most log2(n) comparisons. Keep lo and hi inclusive and stop when lo > hi. "
+)
+
+
+def _paragraphs(size_bytes: int):
+    written, n = 0, 0
+    while written < size_bytes:
+        text = f"{n}. {PARAGRAPH * 4}"
+        written += len(text) + 2
+        n += 1
+        yield n, text
+
+
+def write_text(path: str, size_bytes: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for _, text in _paragraphs(size_bytes):
+            f.write(text + "\n\n")
+
+
+def write_markdown(path: str, size_bytes: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for n, text in _paragraphs(size_bytes):
+            if n % 10 == 1:
+                f.write(f"## Section {n // 10 + 1}\n\n")
+            f.write(text + "\n\n")
+
+
+def write_docx(path: str, size_bytes: int) -> None:
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z, z.open("word/document.xml", "w") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{ns}"><w:body>'.encode())
+        for n, text in _paragraphs(size_bytes):
+            brk = '<w:r><w:br w:type="page"/></w:r>' if n % 8 == 0 else ""
+            f.write(f"<w:p><w:r><w:t>{escape(text)}</w:t></w:r>{brk}</w:p>".encode())
+        f.write(b"</w:body></w:document>")
+
+
+def run(path: str, repeat: int) -> dict:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    best, sections, chunks = None, 0, 0
+    for _ in range(repeat):
+        sections = 0
+
+        def counted():
+            nonlocal sections
+            for page in load_document(path):
+                sections += 1
+                yield page
+
+        start = time.perf_counter()
+        chunks = sum(1 for _ in iter_chunks(counted(), splitter, {"document_id": "bench"}))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    mb = os.path.getsize(path) / 1e6
+    return {
+        "format": detect_format(path),
+        "file": os.path.basename(path),
+        "mb": mb,
+        "seconds": best,
+        "mb_s": mb / best if best else 0.0,
+        "sections_s": sections / best if best else 0.0,
+        "chunks_s": chunks / best if best else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="+", help="files to measure instead of generated ones")
+    parser.add_argument("--size-mb", type=float, default=10.0, help="size of each generated file")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per file; the fastest is reported")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files: List[str] = args.files or []
+        if not files:
+            size = int(args.size_mb * 1e6)
+            for name, writer in (("sample.txt", write_text), ("sample.md", write_markdown), ("sample.docx", write_docx)):
+                path = os.path.join(tmp, name)
+                writer(path, size)
+                files.append(path)
+
+        print(f"{'format':>8}  {'file':<24} {'MB':>7} {'sec':>7} {'MB/s':>8} {'sect/s':>9} {'chunks/s':>9}")
+        for path in files:
+            r = run(path, max(1, args.repeat))
+            print(
+                f"{r['format']:>8}  {r['file'][:24]:<24} {r['mb']:>7.1f} {r['seconds']:>7.2f} "
+                f"{r['mb_s']:>8.1f} {r['sections_s']:>9.0f} {r['chunks_s']:>9.0f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
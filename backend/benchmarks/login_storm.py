@@ -0,0 +1,142 @@
+"""
+Measure login throughput and how much a burst of logins slows /ask.
+
+Against a running API: first probes /ask/stream alone for --baseline-seconds,
+then fires --logins sign-ins (--concurrency at a time) while the probe keeps
+running. Reports logins/s with login latency, and the probe's time to first
+byte (p50/p95/p99) without and during the storm. With hashing on the event
+loop the storm shows up directly in the probe's tail; on the hashing pool it
+should barely move it.
+
+    cd backend
+    python -m benchmarks.login_storm --email bench@example.com --password secret \\
+        --collection my_rag --logins 300 --concurrency 32
+    python -m benchmarks.login_storm --email bench@example.com --password secret --probe me
+
+--probe me uses GET /auth/me (no LLM call) when there is no RAG to ask.
+The account must exist; every sign-in uses it.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+
+AUTH = "/api/v1/auth"
+RAG = "/api/v1/rag"
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _summary(name: str, values: List[float]) -> str:
+    ms = [v * 1000 for v in values]
+    if not ms:
+        return f"{name:<22} no samples"
+    return (
+        f"{name:<22} n={len(ms):<5} p50={_percentile(ms, 50):7.1f}ms p95={_percentile(ms, 95):7.1f}ms "
+        f"p99={_percentile(ms, 99):7.1f}ms max={max(ms):7.1f}ms"
+    )
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> float:
+    start = time.perf_counter()
+    r = await client.post(f"{AUTH}/signin", json={"email": email, "password": password})
+    r.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def _probe_once(client: httpx.AsyncClient, args) -> float:
+    """Seconds to the first byte of the response."""
+    start = time.perf_counter()
+    if args.probe == "me":
+        r = await client.get(f"{AUTH}/me")
+        r.raise_for_status()
+        return time.perf_counter() - start
+    body = {"query": args.query, "collection_name": args.collection}
+    async with client.stream("POST", f"{RAG}/ask/stream", json=body) as r:
+        r.raise_for_status()
+        async for _ in r.aiter_bytes():
+            return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+async def _probe(client: httpx.AsyncClient, args, stop: asyncio.Event, samples: List[float]) -> None:
+    while not stop.is_set():
+        samples.append(await _probe_once(client, args))
+        await asyncio.sleep(args.probe_interval)
+
+
+async def run(args) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        await _login(client, args.email, args.password)  # session cookie for the probe
+
+        stop = asyncio.Event()
+        baseline: List[float] = []
+        task = asyncio.create_task(_probe(client, args, stop, baseline))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        await task
+
+        stop = asyncio.Event()
+        during: List[float] = []
+        task = asyncio.create_task(_probe(client, args, stop, during))
+        gate = asyncio.Semaphore(args.concurrency)
+        errors = 0
+
+        # A separate client for the storm, so its sign-ins don't replace the probe's cookie
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as storm:
+            async def one() -> Optional[float]:
+                nonlocal errors
+                async with gate:
+                    try:
+                        return await _login(storm, args.email, args.password)
+                    except httpx.HTTPError:
+                        errors += 1
+                        return None
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*(one() for _ in range(args.logins)))
+            elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+
+    logins = [r for r in results if r is not None]
+    print(f"logins: {len(logins)} ok, {errors} failed in {elapsed:.1f}s -> {len(logins) / elapsed:.1f}/s")
+    print(_summary("login latency", logins))
+    print(_summary(f"{args.probe} TTFB baseline", baseline))
+    print(_summary(f"{args.probe} TTFB during storm", during))
+    if baseline and during:
+        print(f"p99 slowdown: x{_percentile(during, 99) / max(_percentile(baseline, 99), 1e-9):.1f} "
+              f"(median x{statistics.median(during) / max(statistics.median(baseline), 1e-9):.1f})")
+    return 0 if not errors else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--probe", choices=("ask", "me"), default="ask")
+    parser.add_argument("--collection", help="RAG collection to ask (--probe ask)")
+    parser.add_argument("--query", default="What is this document about?")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="pause between probe requests")
+    args = parser.parse_args(argv)
+    if args.probe == "ask" and not args.collection:
+        parser.error("--collection is required with --probe ask")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
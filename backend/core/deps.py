@@ -1,17 +1,20 @@
 from fastapi import Depends,HTTPException,status,Request
 from fastapi.security import HTTPBearer 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.supabase import get_db
 from core.security import decode_access_token
 from models.user_model import User
+from core import user_cache
+from core.user_cache import CurrentUser
 
 
 security = HTTPBearer()
 COOKIE_NAME = "session"
 async def get_current_user(
     req: Request,
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_db),
+) -> CurrentUser:
     token = req.cookies.get(COOKIE_NAME)
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing session cookie")
@@ -24,9 +27,14 @@ async def get_current_user(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token missing 'sub'")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    # Cache hits never touch the session, so no connection is checked out
+    user = await user_cache.get(user_id)
+    if user is None:
+        row = await db.scalar(select(User).where(User.id == user_id))
+        if not row:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = CurrentUser.from_orm(row)
+        await user_cache.put(user_id, user)
 
     
     req.state.user = user
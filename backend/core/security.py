@@ -1,6 +1,9 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime,timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import bcrypt
 from jose import JWTError,jwt
 from passlib.context import CryptContext
 from dotenv import load_dotenv
@@ -10,16 +13,46 @@ load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM")
 
+# Argon2id cost; hashes made with other settings are upgraded at the next login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Threads for hashing/verifying, separate from the default executor the /ask path uses.
+# argon2 releases the GIL, so each thread is a core; keep this below the core count.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
 
+pwd_context= CryptContext(
+    schemes=["argon2"],
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
 
-pwd_context= CryptContext(  schemes=["argon2", "bcrypt"],deprecated ="auto")
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def verify_and_update(plain_password:str, hashed_password:str) -> Tuple[bool, Optional[str]]:
+    """Check a password; the second value is a new hash to store when the old one is outdated."""
+    if hashed_password.startswith(_BCRYPT_PREFIXES):
+        # Legacy bcrypt hash. passlib 1.7's bcrypt backend fails on bcrypt>=4.1, so check it
+        # directly (bcrypt only ever used the first 72 bytes) and replace it with argon2
+        ok = bcrypt.checkpw(plain_password.encode("utf-8")[:72], hashed_password.encode("utf-8"))
+        return ok, (pwd_context.hash(plain_password) if ok else None)
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 def verify_password(plain_password :str ,hashed_password:str)->bool:
-    return pwd_context.verify(plain_password,hashed_password)
+    return verify_and_update(plain_password, hashed_password)[0]
 
 def get_password_hash(password:str)->str:
     return pwd_context.hash(password)    
 
+async def averify_and_update(plain_password:str, hashed_password:str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update on the hashing pool, so the event loop keeps serving other requests."""
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_and_update, plain_password, hashed_password)
+
+async def aget_password_hash(password:str)->str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, get_password_hash, password)
+
 def create_access_token(data:dict, expires_delta:Optional[timedelta]= None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,98 @@
+"""Cache of authenticated users, keyed by the token subject (the user id).
+
+Two tiers: a short-lived in-process LRU, then valkey, shared by every API
+worker. Values are CurrentUser records (a handful of columns, immutable), never
+ORM instances, so they outlive the session that loaded them.
+
+invalidate() drops the valkey entry and this process's copy; other workers
+keep theirs until USER_CACHE_LOCAL_TTL runs out, which is why that TTL is short.
+"""
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+from db.valkey import get_async_valkey
+from rag.cache import LRUCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_LOCAL_TTL = int(os.getenv("USER_CACHE_LOCAL_TTL", "30"))  # seconds
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))  # seconds, valkey tier
+
+_local = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_LOCAL_TTL)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """What request handlers need of the signed-in user."""
+    id: UUID
+    email: str
+    full_name: str
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_orm(cls, user) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, full_name=user.full_name, created_at=user.created_at)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["id"] = str(self.id)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "CurrentUser":
+        data = json.loads(raw)
+        return cls(
+            id=UUID(data["id"]),
+            email=data["email"],
+            full_name=data["full_name"],
+            created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None,
+        )
+
+
+def _key(subject: str) -> str:
+    return f"rag:user:{subject}"
+
+
+async def get(subject: str) -> Optional[CurrentUser]:
+    user = _local.get(subject)
+    if user is not None:
+        return user
+    try:
+        raw = await get_async_valkey().get(_key(subject))
+    except Exception as e:
+        logger.warning(f"User cache read failed: {e}")
+        return None
+    if raw is None:
+        return None
+    user = CurrentUser.from_json(raw)
+    _local.set(subject, user)
+    return user
+
+
+async def put(subject: str, user: CurrentUser) -> None:
+    _local.set(subject, user)
+    try:
+        await get_async_valkey().set(_key(subject), user.to_json(), ex=USER_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"User cache write failed: {e}")
+
+
+async def invalidate(subject) -> None:
+    """Call on logout and whenever the user row changes or is deleted."""
+    _local.pop(str(subject))
+    try:
+        await get_async_valkey().delete(_key(str(subject)))
+    except Exception as e:
+        logger.warning(f"User cache invalidation failed: {e}")
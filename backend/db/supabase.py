@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from uuid import uuid4
 import os
 
 load_dotenv()
@@ -11,7 +14,67 @@ if not SUPABASE_DB_URL:
     raise ValueError(
         "SUPABASE_DB_URL is not set. Add it to backend/.env (and ensure env_file is used in docker-compose)."
     )
-engine = create_engine(SUPABASE_DB_URL, echo=True)
+
+# Logs every statement; only for debugging
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+# Pool of the API process (async engine); Celery workers use DB_SYNC_POOL_SIZE each
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; below Supabase's idle cutoff
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "5"))
+# Set when SUPABASE_DB_URL points at PgBouncer / Supavisor in transaction mode (port 6543)
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+def _async_url(url: str):
+    """The same database through asyncpg, which takes `ssl` where libpq takes `sslmode`."""
+    parsed = make_url(url)
+    query = dict(parsed.query)
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        query["ssl"] = sslmode
+    return parsed.set(drivername="postgresql+asyncpg", query=query)
+
+
+def _async_connect_args() -> dict:
+    if not DB_PGBOUNCER:
+        return {}
+    # A transaction pooler hands each transaction a different server connection, so
+    # named prepared statements from an earlier one may not exist (or may clash)
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+# Request handlers: asyncpg, so queries don't block the event loop
+async_engine = create_async_engine(
+    _async_url(SUPABASE_DB_URL),
+    echo=DB_ECHO,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_async_connect_args(),
+)
+
+# expire_on_commit=False: handlers read attributes after commit, and async sessions can't lazy-load
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Celery indexing code only (sync, one session per task)
+engine = create_engine(
+    SUPABASE_DB_URL,
+    echo=DB_ECHO,
+    pool_size=DB_SYNC_POOL_SIZE,
+    max_overflow=DB_SYNC_POOL_SIZE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -19,9 +82,6 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import logging
+import os
+
+import redis
+import redis.asyncio as aredis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Same instance Celery uses as broker; VALKEY_URL lets caches live on a separate db/host
+VALKEY_URL = (
+    os.getenv("VALKEY_URL")
+    or os.getenv("REDIS_URL")
+    or os.getenv("CELERY_BROKER_URL")
+    or "redis://valkey:6379/0"
+)
+VALKEY_TIMEOUT = float(os.getenv("VALKEY_TIMEOUT", "0.5"))
+
+_client = None
+_async_client = None
+
+
+def get_valkey() -> redis.Redis:
+    """Shared valkey client. Short timeouts so a missing valkey degrades caches instead of requests."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            VALKEY_URL,
+            socket_timeout=VALKEY_TIMEOUT,
+            socket_connect_timeout=VALKEY_TIMEOUT,
+        )
+    return _client
+
+
+def get_async_valkey() -> aredis.Redis:
+    """Async counterpart of get_valkey for code running on the event loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = aredis.Redis.from_url(
+            VALKEY_URL,
+            socket_timeout=VALKEY_TIMEOUT,
+            socket_connect_timeout=VALKEY_TIMEOUT,
+        )
+    return _async_client
@@ -11,13 +11,14 @@ class Document(Base):
     __tablename__ = "documents"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    rag_id = Column(UUID(as_uuid=True), ForeignKey("rag_instances.id", ondelete="CASCADE"), nullable=False)
+    rag_id = Column(UUID(as_uuid=True), ForeignKey("rag_instances.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     filename = Column(String(255), nullable=False)
     file_path = Column(Text, nullable=False)  # Supabase Storage path
     file_type = Column(String(50), nullable=False)  # pdf, txt, docx, etc.
     file_size = Column(BigInteger, nullable=False)  # in bytes
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the file, to skip unchanged uploads
     
     # Processing status: pending, processing, completed, failed
     status = Column(String(20), default="pending")
@@ -26,6 +27,7 @@ class Document(Base):
     # Qdrant tracking
     qdrant_point_ids = Column(JSONB, default=list)  # Array of point IDs in Qdrant
     total_chunks = Column(Integer, default=0)
+    indexing_metrics = Column(JSONB, nullable=True)  # per-stage timings/counters of the last indexing
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column,String,UUID,ForeignKey,Text,Integer,Boolean
+from sqlalchemy import Column,String,UUID,ForeignKey,Text,Integer,Boolean,Float,Index
 from db.supabase import Base
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
 import uuid
 from enum import Enum
 
@@ -10,8 +11,21 @@ class StatusEnum(str, Enum):
         READY = "completed"
         PROCESSING ='processing'
 
+class QuantizationEnum(str, Enum):
+        NONE = "none"
+        SCALAR = "scalar"  # int8, ~4x smaller in RAM
+        BINARY = "binary"  # 1 bit per dimension, ~32x smaller in RAM
+
+class RetrievalModeEnum(str, Enum):
+        DENSE = "dense"
+        SPARSE = "sparse"  # BM25 only, no embedding call
+        HYBRID = "hybrid"  # dense + sparse, reciprocal-rank fusion
+        AUTO = "auto"  # hybrid when the collection has sparse vectors, dense otherwise
+
 class RAGInstance(Base):
     __tablename__= "rag_instances"
+    # Serves the owner filter and the keyset order of get-user-rags
+    __table_args__ = (Index("ix_rag_instances_user_id_name_id", "user_id", "name", "id"),)
     
     id= Column(UUID(as_uuid = True),primary_key=True,default=uuid.uuid4,index=True)
     user_id = Column(UUID(as_uuid=True),ForeignKey("users.id",ondelete="CASCADE"),nullable=False)
@@ -23,14 +37,30 @@ class RAGInstance(Base):
     qdrant_collection =Column(String(50),unique=True,nullable=False)
         
     embedding_model = Column(String(50),default="text-embedding-3-large")
+    embedding_dimensions = Column(Integer, nullable=True)  # None = the model's full size
     llm_model = Column(String(50),default="gpt-4o-mini")
     chunk_size = Column(Integer, default=1000)
     chunk_overlap = Column(Integer, default=400)
     top_k = Column(Integer, default=5)
+
+    # Retrieval settings used at query time; None falls back to the server defaults
+    score_threshold = Column(Float, nullable=True)  # min cosine similarity for dense hits
+    mmr_lambda = Column(Float, nullable=True)  # enables MMR re-ranking when set
+    context_token_budget = Column(Integer, nullable=True)
+
+    # Vector storage profile, applied when the Qdrant collection is created
+    vector_quantization = Column(String(20), default=QuantizationEnum.SCALAR.value)
+    vectors_on_disk = Column(Boolean, default=True)
+    hnsw_m = Column(Integer, default=16)
+    hnsw_ef_construct = Column(Integer, default=100)
+    # BM25 sparse vectors stored alongside the dense ones (enables sparse/hybrid retrieval)
+    sparse_vectors = Column(Boolean, default=True)
         
     document_count = Column(Integer,default=0)
     is_active = Column(Boolean,default=True)
     status = Column(String(50),default=StatusEnum.PENDING.value)
+    # Last indexing run: task id, start/finish, per-stage totals and rates (see rag/metrics.py)
+    indexing_metrics = Column(JSONB, nullable=True)
     user = relationship("User", back_populates="rag_instances")
     documents = relationship("Document", back_populates="rag_instance", cascade="all, delete-orphan")
         
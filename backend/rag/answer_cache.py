@@ -0,0 +1,172 @@
+"""Semantic answer cache.
+
+Every RAG gets a companion Qdrant collection "<collection>__answers" holding
+(query vector -> answer) pairs. The suffix is reserved: create_rag refuses RAG
+collections ending in it, so clear() can only ever drop a companion. A new question whose vector is within
+ANSWER_CACHE_THRESHOLD cosine similarity of a stored one gets the stored answer.
+
+Staleness is handled twice over: the companion collection is dropped whenever
+the RAG is re-indexed or deleted, and every entry records the collection
+generation it was answered at, so an answer computed against the old documents
+while a re-index was running is never served afterwards. If the generation
+cannot be read (valkey down) the cache is bypassed.
+"""
+
+import logging
+import os
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchValue,
+    PointStruct,
+    Range,
+    VectorParams,
+)
+
+from rag.cache import acollection_generation
+from rag.embeddings import normalize_query
+from rag.registry import get_async_qdrant_client, get_qdrant_client
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))  # seconds
+REPLAY_CHUNK_CHARS = 64
+
+
+ANSWER_COLLECTION_SUFFIX = "__answers"
+
+
+def answer_collection_name(collection_name: str) -> str:
+    return f"{collection_name}{ANSWER_COLLECTION_SUFFIX}"
+
+
+def is_answer_collection(collection_name: str) -> bool:
+    return collection_name.endswith(ANSWER_COLLECTION_SUFFIX)
+
+
+def _entry_filter(generation: int, chat_model: str) -> Filter:
+    return Filter(
+        must=[
+            FieldCondition(key="generation", match=MatchValue(value=generation)),
+            FieldCondition(key="chat_model", match=MatchValue(value=chat_model)),
+            FieldCondition(key="created_at", range=Range(gte=time.time() - ANSWER_CACHE_TTL)),
+        ]
+    )
+
+
+def _expired_selector() -> FilterSelector:
+    return FilterSelector(
+        filter=Filter(must=[FieldCondition(key="created_at", range=Range(lt=time.time() - ANSWER_CACHE_TTL))])
+    )
+
+
+def _entry_point(chat_model: str, query: str, query_vector: List[float], result: Dict, generation: int) -> PointStruct:
+    return PointStruct(
+        id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{chat_model}\0{normalize_query(query)}")),
+        vector=query_vector,
+        payload={
+            "query": query,
+            "result": result,
+            "chat_model": chat_model,
+            "generation": generation,
+            "created_at": time.time(),
+        },
+    )
+
+
+async def acurrent_generation(collection_name: str) -> Optional[int]:
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    return await acollection_generation(collection_name)
+
+
+async def alookup(
+    collection_name: str,
+    chat_model: str,
+    query_vector: List[float],
+    generation: Optional[int],
+) -> Optional[Dict]:
+    """Async lookup for the event-loop query path; same semantics as lookup."""
+    if not ANSWER_CACHE_ENABLED or generation is None or query_vector is None:
+        return None
+    client = get_async_qdrant_client()
+    name = answer_collection_name(collection_name)
+    try:
+        response = await client.query_points(
+            collection_name=name,
+            query=query_vector,
+            query_filter=_entry_filter(generation, chat_model),
+            score_threshold=ANSWER_CACHE_THRESHOLD,
+            limit=1,
+            with_payload=True,
+        )
+    except UnexpectedResponse as e:
+        if e.status_code != 404:
+            logger.warning(f"Answer cache lookup failed for {collection_name}: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"Answer cache lookup failed for {collection_name}: {e}")
+        return None
+    if not response.points:
+        return None
+    logger.info(f"Answer cache hit for {collection_name} (score {response.points[0].score:.4f})")
+    return response.points[0].payload["result"]
+
+
+async def astore(
+    collection_name: str,
+    chat_model: str,
+    query: str,
+    query_vector: List[float],
+    result: Dict,
+    generation: Optional[int],
+) -> None:
+    if not ANSWER_CACHE_ENABLED or generation is None or query_vector is None:
+        return
+    client = get_async_qdrant_client()
+    name = answer_collection_name(collection_name)
+    point = _entry_point(chat_model, query, query_vector, result, generation)
+    try:
+        try:
+            await client.upsert(collection_name=name, points=[point], wait=False)
+        except UnexpectedResponse as e:
+            if e.status_code != 404:
+                raise
+            await client.create_collection(
+                collection_name=name,
+                vectors_config=VectorParams(size=len(query_vector), distance=Distance.COSINE),
+            )
+            await client.upsert(collection_name=name, points=[point], wait=False)
+        await client.delete(collection_name=name, points_selector=_expired_selector(), wait=False)
+    except Exception as e:
+        logger.warning(f"Answer cache store failed for {collection_name}: {e}")
+
+
+def clear(collection_name: str) -> None:
+    """Drop every cached answer for a RAG. Called on re-index and delete."""
+    client = get_qdrant_client()
+    name = answer_collection_name(collection_name)
+    try:
+        if client.collection_exists(name):
+            client.delete_collection(collection_name=name)
+            logger.info(f"Cleared answer cache {name}")
+    except Exception as e:
+        logger.warning(f"Could not clear answer cache {name}: {e}")
+
+
+def replay(answer: str) -> Iterator[str]:
+    """Yield a cached answer in small pieces so /ask/stream clients see a normal stream."""
+    for i in range(0, len(answer), REPLAY_CHUNK_CHARS):
+        yield answer[i:i + REPLAY_CHUNK_CHARS]
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from db.valkey import get_async_valkey, get_valkey
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a size cap and an optional per-entry TTL (seconds)."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires_at, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate; returns how many were dropped."""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ---- Collection generations
+# API workers and Celery workers are separate processes, so "this collection changed"
+# is published as a counter in valkey. Anything cached per collection remembers the
+# generation it was built at and is rebuilt once the counter moves.
+
+def _generation_key(collection_name: str) -> str:
+    return f"rag:gen:{collection_name}"
+
+
+async def acollection_generation(collection_name: str) -> Optional[int]:
+    """Current generation of a collection, or None if valkey is unreachable."""
+    try:
+        value = await get_async_valkey().get(_generation_key(collection_name))
+        return int(value) if value is not None else 0
+    except Exception as e:
+        logger.warning(f"Could not read generation for {collection_name}: {e}")
+        return None
+
+
+def bump_collection_generation(collection_name: str) -> None:
+    """Mark every cached view of a collection as stale, in all processes."""
+    try:
+        get_valkey().incr(_generation_key(collection_name))
+    except Exception as e:
+        logger.warning(f"Could not bump generation for {collection_name}: {e}")
@@ -0,0 +1,192 @@
+"""Content-addressed cache of chunk embeddings, shared by every RAG and worker.
+
+Keys are sha256(model, dimensions, chunk text), so the same PDF chunked the
+same way is embedded once no matter how many RAGs are built from it. Vectors
+are stored as float32 blobs in one SQLite file (WAL mode, so several Celery
+worker processes can read and write it at once). When the live data grows
+past CHUNK_EMBEDDING_CACHE_MAX_MB the least recently used entries are evicted.
+Hit/miss counters live in the same file, so every process sees the totals.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CHUNK_EMBEDDING_CACHE_ENABLED = os.getenv("CHUNK_EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CHUNK_EMBEDDING_CACHE_PATH = os.getenv("CHUNK_EMBEDDING_CACHE_PATH", "cache/chunk_embeddings.sqlite3")
+CHUNK_EMBEDDING_CACHE_MAX_MB = int(os.getenv("CHUNK_EMBEDDING_CACHE_MAX_MB", "2048"))
+EVICT_FRACTION = 0.1  # share of entries dropped per eviction round
+_SQLITE_VARS = 500  # keys per IN (...) query, under SQLite's bound-parameter limit
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread (ingestion embeds from a thread pool)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CHUNK_EMBEDDING_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CHUNK_EMBEDDING_CACHE_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def chunk_key(model: str, dimensions: Optional[int], text: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{dimensions or 'full'}\0{text}".encode("utf-8")).digest()
+
+
+def get_many(keys: List[bytes]) -> Dict[bytes, List[float]]:
+    conn = _connect()
+    found = {}
+    for i in range(0, len(keys), _SQLITE_VARS):
+        part = keys[i:i + _SQLITE_VARS]
+        marks = ",".join("?" * len(part))
+        rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part).fetchall()
+        for key, blob in rows:
+            found[bytes(key)] = np.frombuffer(blob, dtype=np.float32).tolist()
+        if rows:
+            conn.execute(
+                f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                [int(time.time()), *(r[0] for r in rows)],
+            )
+    return found
+
+
+def put_many(items: Dict[bytes, List[float]]) -> None:
+    if not items:
+        return
+    now = int(time.time())
+    conn = _connect()
+    conn.executemany(
+        "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+        [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()],
+    )
+    _evict_if_needed(conn)
+
+
+def _used_bytes(conn: sqlite3.Connection) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (pages - free) * page_size
+
+
+def _evict_if_needed(conn: sqlite3.Connection) -> None:
+    limit = CHUNK_EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+    if _used_bytes(conn) <= limit:
+        return
+    total = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    drop = max(1, int(total * EVICT_FRACTION))
+    # Freed pages are reused by later inserts, so the file stops growing
+    conn.execute(
+        "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+        (drop,),
+    )
+    logger.info(f"Chunk embedding cache over {CHUNK_EMBEDDING_CACHE_MAX_MB} MB, evicted {drop} of {total} entries")
+
+
+def _add_counters(hits: int, misses: int) -> None:
+    _connect().executemany(
+        "INSERT INTO counters (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        [("hits", hits), ("misses", misses)],
+    )
+
+
+def stats() -> Dict:
+    """Totals across every process using the cache file."""
+    if not CHUNK_EMBEDDING_CACHE_ENABLED:
+        return {"enabled": False}
+    conn = _connect()
+    counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    return {
+        "enabled": True,
+        "entries": conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0],
+        "bytes": _used_bytes(conn),
+        "max_bytes": CHUNK_EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
+
+
+class CachedChunkEmbeddings(Embeddings):
+    """
+    Wraps the indexing embeddings client: cached chunks never reach the API.
+    Counts hits/misses for the document being indexed; a broken cache file
+    only costs the savings, never the indexing.
+    """
+
+    def __init__(self, inner: Embeddings, model: str, dimensions: Optional[int] = None):
+        self.inner = inner
+        self.model = model
+        self.dimensions = dimensions
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not CHUNK_EMBEDDING_CACHE_ENABLED:
+            return self.inner.embed_documents(texts)
+        keys = [chunk_key(self.model, self.dimensions, t) for t in texts]
+        try:
+            found = get_many(list(set(keys)))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Chunk embedding cache read failed: {e}")
+            found = {}
+
+        # Repeated chunks (headers, boilerplate) go to the API once
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            text_of = dict(zip(keys, texts))
+            fresh = self.inner.embed_documents([text_of[k] for k in missing])
+            new = dict(zip(missing, fresh))
+            try:
+                put_many(new)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Chunk embedding cache write failed: {e}")
+            found.update(new)
+
+        hits = len(texts) - len(missing)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+        try:
+            _add_counters(hits, len(missing))
+        except (sqlite3.Error, OSError):
+            pass
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import tiktoken
+from langchain_core.documents import Document
+
+from rag.ingest import CHUNK_OVERLAP
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+TRUNCATED_MARK = "\n... [truncated]"
+# Neighbouring chunks share at most the splitter's overlap. A shorter common suffix/prefix
+# is more likely coincidence ("hello." / ".world") than overlap, and trimming it loses text
+MAX_OVERLAP_CHARS = CHUNK_OVERLAP
+MIN_OVERLAP_CHARS = max(1, CHUNK_OVERLAP // 4)
+TOKENIZER_RETRY_SECONDS = 60  # after a failed tokenizer load, approximate for this long
+
+
+class _ApproxEncoding:
+    """~4 characters per token; used only when the real tokenizer cannot be loaded."""
+
+    name = "approx"
+
+    def encode(self, text: str) -> List[int]:
+        return [0] * ((len(text) + 3) // 4)
+
+
+_APPROX = _ApproxEncoding()
+_retry_at = {}  # model -> monotonic time of the next tokenizer load attempt
+_encodings = {}  # model -> loaded tiktoken encoding; failures are never stored
+
+
+def _load_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def get_encoding(model: str):
+    """Tokenizer for a chat model, built once per process. May block on a download."""
+    enc = _encodings.get(model)
+    if enc is not None:
+        return enc
+    if time.monotonic() < _retry_at.get(model, 0.0):
+        return _APPROX
+    try:
+        enc = _encodings[model] = _load_encoding(model)
+        return enc
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use; don't fail queries if that is impossible
+        logger.warning(f"Could not load tokenizer for {model}, approximating token counts: {e}")
+        _retry_at[model] = time.monotonic() + TOKENIZER_RETRY_SECONDS
+        return _APPROX
+
+
+async def aget_encoding(model: str):
+    """get_encoding for the event loop: a first load (or a retry) runs in a thread."""
+    enc = _encodings.get(model)
+    if enc is not None:
+        return enc
+    if time.monotonic() < _retry_at.get(model, 0.0):
+        return _APPROX
+    return await asyncio.to_thread(get_encoding, model)
+
+
+def count_tokens(text: str, model: str) -> int:
+    return len(get_encoding(model).encode(text))
+
+
+def _truncate(enc, text: str, max_tokens: int) -> str:
+    """Longest head of `text` that encodes to at most `max_tokens` tokens."""
+    if max_tokens <= 0:
+        return ""
+    if isinstance(enc, _ApproxEncoding):
+        return text[: max_tokens * 4]
+    tokens = enc.encode(text)
+    keep = min(len(tokens), max_tokens)
+    # Decoding a token prefix can re-encode to a few more tokens; back off until it fits
+    while keep > 0:
+        head = enc.decode(tokens[:keep])
+        if len(enc.encode(head)) <= max_tokens:
+            return head
+        keep -= 1
+    return ""
+
+
+@dataclass
+class PackedContext:
+    text: str
+    citations: List[Dict]
+    tokens_used: int = 0
+    tokens_saved: int = 0  # overlap removed by merging neighbouring chunks
+    chunks_in: int = 0
+    chunks_dropped: int = 0  # blocks that did not fit the budget
+
+    def stats(self) -> Dict:
+        return {
+            "citations": self.citations,
+            "used_k": len(self.citations),
+            "context_tokens": self.tokens_used,
+            "context_tokens_saved": self.tokens_saved,
+            "chunks_in": self.chunks_in,
+            "chunks_dropped": self.chunks_dropped,
+        }
+
+
+@dataclass
+class _Block:
+    rank: int
+    doc_key: str
+    source: str
+    first_chunk: Optional[int]
+    last_chunk: Optional[int]
+    pages: List[str] = field(default_factory=list)
+    text: str = ""
+
+    @property
+    def page(self) -> str:
+        pages = [p for p in self.pages if p != "?"] or ["?"]
+        return pages[0] if pages[0] == pages[-1] else f"{pages[0]}-{pages[-1]}"
+
+
+def _page_of(m: Dict) -> str:
+    return str(m.get("page_label") or m.get("page") or m.get("page_number") or "?")
+
+
+def _source_of(m: Dict) -> str:
+    return m.get("source") or m.get("file") or m.get("path") or "?"
+
+
+def _overlap(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right`, or 0
+    when it is shorter than MIN_OVERLAP_CHARS.
+    """
+    limit = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_neighbours(results: Sequence[Document]) -> List[_Block]:
+    """
+    Turn ranked chunks into blocks. Chunks of the same document with consecutive
+    chunk_ids are joined into one block with the splitter overlap removed; the
+    block ranks as well as its best member.
+    """
+    blocks: List[_Block] = []
+    seen_text = set()
+    for rank, d in enumerate(results):
+        m = d.metadata or {}
+        if d.page_content in seen_text:
+            continue
+        seen_text.add(d.page_content)
+        chunk_id = m.get("chunk_id")
+        blocks.append(_Block(
+            rank=rank,
+            doc_key=str(m.get("document_id") or _source_of(m)),
+            source=_source_of(m),
+            first_chunk=chunk_id,
+            last_chunk=chunk_id,
+            pages=[_page_of(m)],
+            text=d.page_content,
+        ))
+
+    merged = True
+    while merged:
+        merged = False
+        for a in blocks:
+            for b in blocks:
+                if (
+                    a is not b
+                    and a.doc_key == b.doc_key
+                    and a.last_chunk is not None
+                    and b.first_chunk is not None
+                    and b.first_chunk == a.last_chunk + 1
+                ):
+                    a.text += b.text[_overlap(a.text, b.text):]
+                    a.last_chunk = b.last_chunk
+                    a.pages += b.pages
+                    a.rank = min(a.rank, b.rank)
+                    blocks.remove(b)
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(blocks, key=lambda blk: blk.rank)
+
+
+def pack_context(results: Sequence[Document], model: str, max_tokens: int, enc=None) -> PackedContext:
+    """
+    Build the prompt context from ranked chunks: merge neighbours, then add whole
+    blocks in rank order while they fit in `max_tokens` (counted with the chat
+    model's tokenizer, or `enc` when the caller already has it). Blocks that do
+    not fit are skipped, not cut.
+    """
+    enc = enc or get_encoding(model)
+    raw_tokens = sum(len(enc.encode(d.page_content)) for d in results)
+    blocks = _merge_neighbours(results)
+    merged_tokens = sum(len(enc.encode(b.text)) for b in blocks)
+
+    sep_tokens = len(enc.encode(CHUNK_SEPARATOR))
+    parts, citations, used, dropped = [], [], 0, 0
+    for b in blocks:
+        n = len(parts) + 1
+        part = f"Chunk {n} — page {b.page} — {b.source}\n{b.text}"
+        cost = len(enc.encode(part)) + (sep_tokens if parts else 0)
+        if used + cost > max_tokens:
+            dropped += 1
+            continue
+        parts.append(part)
+        citations.append({"chunk": n, "page": b.page, "source": b.source})
+        used += cost
+
+    if not parts and blocks:
+        # Even the best block is over budget: send its head rather than nothing
+        b = blocks[0]
+        full = f"Chunk 1 — page {b.page} — {b.source}\n{b.text}"
+        budget = max_tokens - len(enc.encode(TRUNCATED_MARK))
+        part = ""
+        # The mark can merge with the last token of the head, so check the joined text
+        while budget > 0:
+            part = _truncate(enc, full, budget) + TRUNCATED_MARK
+            if len(enc.encode(part)) <= max_tokens:
+                break
+            budget -= 1
+            part = ""
+        if part:
+            parts, citations = [part], [{"chunk": 1, "page": b.page, "source": b.source}]
+            used, dropped = len(enc.encode(part)), len(blocks) - 1
+
+    return PackedContext(
+        text=CHUNK_SEPARATOR.join(parts),
+        citations=citations,
+        tokens_used=used,
+        tokens_saved=raw_tokens - merged_tokens,
+        chunks_in=len(results),
+        chunks_dropped=dropped,
+    )
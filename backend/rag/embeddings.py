@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from db.valkey import get_async_valkey, get_valkey
+from rag.cache import LRUCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+QUERY_EMBEDDING_LOCAL_TTL = int(os.getenv("QUERY_EMBEDDING_LOCAL_TTL", "3600"))  # seconds
+QUERY_EMBEDDING_TTL = int(os.getenv("QUERY_EMBEDDING_TTL", "604800"))  # seconds, valkey tier
+
+# Query vectors are a pure function of (model, text), so one cache serves every RAG
+_local = LRUCache(maxsize=QUERY_EMBEDDING_CACHE_SIZE, ttl=QUERY_EMBEDDING_LOCAL_TTL)
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.local_hits + self.remote_hits + self.misses
+            hits = self.local_hits + self.remote_hits
+            return {
+                "local_hits": self.local_hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "local_entries": len(_local),
+            }
+
+
+stats = _Stats()
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _cache_key(model: str, dimensions: Optional[int], text: str) -> str:
+    digest = hashlib.sha256(f"{model}\0{dimensions}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+    return f"rag:qemb:{model}:{dimensions or 'full'}:{digest}"
+
+
+def _to_bytes(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _from_bytes(raw: bytes) -> List[float]:
+    return np.frombuffer(raw, dtype=np.float32).tolist()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    OpenAIEmbeddings with a two-tier cache in front of embed_query:
+    an in-process LRU, then valkey (shared by all workers).
+    Document embeddings are passed through untouched.
+    """
+
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        self.model = model
+        self.dimensions = dimensions
+        self._inner = OpenAIEmbeddings(model=model, dimensions=dimensions)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = _cache_key(self.model, self.dimensions, text)
+
+        raw = _local.get(key)
+        if raw is not None:
+            stats.incr("local_hits")
+            return _from_bytes(raw)
+
+        raw = self._remote_get(key)
+        if raw is not None:
+            stats.incr("remote_hits")
+            _local.set(key, raw)
+            return _from_bytes(raw)
+
+        stats.incr("misses")
+        vector = self._inner.embed_query(text)
+        raw = _to_bytes(vector)
+        _local.set(key, raw)
+        self._remote_set(key, raw)
+        # Return the stored precision so hits and misses rank identically
+        return _from_bytes(raw)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = _cache_key(self.model, self.dimensions, text)
+
+        raw = _local.get(key)
+        if raw is not None:
+            stats.incr("local_hits")
+            return _from_bytes(raw)
+
+        raw = await self._aremote_get(key)
+        if raw is not None:
+            stats.incr("remote_hits")
+            _local.set(key, raw)
+            return _from_bytes(raw)
+
+        stats.incr("misses")
+        vector = await self._inner.aembed_query(text)
+        raw = _to_bytes(vector)
+        _local.set(key, raw)
+        await self._aremote_set(key, raw)
+        return _from_bytes(raw)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries: cache hits are served from the LRU/valkey tiers and
+        every miss goes out in a single embeddings request.
+        """
+        keys = [_cache_key(self.model, self.dimensions, t) for t in texts]
+        found = {}
+        for key in set(keys):
+            raw = _local.get(key)
+            if raw is not None:
+                found[key] = raw
+        stats.incr("local_hits", sum(1 for k in keys if k in found))
+
+        remote_keys = [k for k in set(keys) if k not in found]
+        if remote_keys:
+            for key, raw in zip(remote_keys, await self._aremote_mget(remote_keys)):
+                if raw is not None:
+                    found[key] = raw
+                    _local.set(key, raw)
+            remote_set = set(remote_keys)
+            stats.incr("remote_hits", sum(1 for k in keys if k in remote_set and k in found))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            stats.incr("misses", sum(1 for k in keys if k in missing))
+            vectors = await self._inner.aembed_documents(list(missing.values()))
+            fresh = {key: _to_bytes(v) for key, v in zip(missing, vectors)}
+            for key, raw in fresh.items():
+                _local.set(key, raw)
+            found.update(fresh)
+            await self._aremote_mset(fresh)
+
+        return [_from_bytes(found[k]) for k in keys]
+
+    @staticmethod
+    def _remote_get(key: str) -> Optional[bytes]:
+        try:
+            return get_valkey().get(key)
+        except Exception as e:
+            logger.warning(f"Query embedding cache read failed: {e}")
+            return None
+
+    @staticmethod
+    def _remote_set(key: str, raw: bytes) -> None:
+        try:
+            get_valkey().set(key, raw, ex=QUERY_EMBEDDING_TTL)
+        except Exception as e:
+            logger.warning(f"Query embedding cache write failed: {e}")
+
+    @staticmethod
+    async def _aremote_get(key: str) -> Optional[bytes]:
+        try:
+            return await get_async_valkey().get(key)
+        except Exception as e:
+            logger.warning(f"Query embedding cache read failed: {e}")
+            return None
+
+    @staticmethod
+    async def _aremote_set(key: str, raw: bytes) -> None:
+        try:
+            await get_async_valkey().set(key, raw, ex=QUERY_EMBEDDING_TTL)
+        except Exception as e:
+            logger.warning(f"Query embedding cache write failed: {e}")
+
+    @staticmethod
+    async def _aremote_mget(keys: List[str]) -> List[Optional[bytes]]:
+        try:
+            return await get_async_valkey().mget(keys)
+        except Exception as e:
+            logger.warning(f"Query embedding cache read failed: {e}")
+            return [None] * len(keys)
+
+    @staticmethod
+    async def _aremote_mset(items: dict) -> None:
+        try:
+            pipe = get_async_valkey().pipeline(transaction=False)
+            for key, raw in items.items():
+                pipe.set(key, raw, ex=QUERY_EMBEDDING_TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Query embedding cache write failed: {e}")
@@ -1,27 +1,43 @@
 from pathlib import Path
 import logging
-from typing import List
-from langchain_community.document_loaders import PyPDFLoader
+from typing import Callable, List, Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+)
 from dotenv import load_dotenv
 from uuid import UUID
 from sqlalchemy.orm import Session
-from models.raginstance_model import RAGInstance
+from models.raginstance_model import RAGInstance, StatusEnum
 from models.document_model import Document
+from rag.registry import get_qdrant_client, invalidate_collection
+from rag.ingest import CHUNK_OVERLAP, CHUNK_SIZE, INGEST_BATCH_SIZE, index_chunks, iter_chunks
+from rag.loaders import detect_format, load_document
+from rag.metrics import IndexingMetrics, summarize, timed
+from rag.chunk_cache import CachedChunkEmbeddings
+from rag.rate_limit import RateLimitedEmbeddings
+from rag.storage import EMBEDDING_SIZES, collection_config
+from rag import answer_cache
+from rag import rag_cache
 from datetime import datetime
 import os 
+import time
 
 
-CHUNK_SIZE = 1500
-CHUNK_OVERLAP = 200
 load_dotenv()
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 
 EMBEDDING_MODEL = 'text-embedding-3-large'
+DOCUMENT_ID_KEY = "metadata.document_id"
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -34,189 +50,306 @@ def validate_qdrant_connection(url: str) -> None:
     except Exception as e:
         raise ConnectionError(f"Cannot connect to Qdrant at {url}: {e}")
 
-def load_and_index_pdf(pdf_path: Path,qdrant_collection:str,document_id:UUID) -> QdrantVectorStore:
-    """Load PDF, chunk it, and index into Qdrant"""
-    COLLECTION_NAME =qdrant_collection
-    # Validate PDF exists
-    if not  os.path.isfile(pdf_path):
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
-    
-    pdf_name = os.path.splitext(os.path.basename(str(pdf_path)))[0]
-
-    
-    # Load PDF
-    logger.info(f"Loading PDF: {pdf_path}")
-    try:
-        loader = PyPDFLoader(file_path=str(pdf_path))
-        docs = loader.load()
-        logger.info(f"✓ Loaded {len(docs)} pages")
-    except Exception as e:
-        logger.error(f"Error loading PDF: {e}")
-        raise
-    
-    # Split documents
-    logger.info("Splitting documents into chunks...")
+def ensure_document_index(client: QdrantClient, qdrant_collection: str) -> None:
+    """Keyword index on metadata.document_id, so per-document filters and deletes don't scan the collection."""
+    schema = client.get_collection(qdrant_collection).payload_schema or {}
+    if DOCUMENT_ID_KEY not in schema:
+        client.create_payload_index(
+            collection_name=qdrant_collection,
+            field_name=DOCUMENT_ID_KEY,
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+        logger.info(f"✓ Created payload index {DOCUMENT_ID_KEY} on {qdrant_collection}")
+
+def ensure_collection(rag: RAGInstance, qdrant_collection: str) -> None:
+    """Create the collection with the RAG's vector storage profile unless it already exists."""
+    client = get_qdrant_client()
+    if client.collection_exists(qdrant_collection):
+        ensure_document_index(client, qdrant_collection)
+        return
+    model = rag.embedding_model or EMBEDDING_MODEL
+    vector_size = rag.embedding_dimensions or EMBEDDING_SIZES.get(model) or len(
+        OpenAIEmbeddings(model=model).embed_query("dimension probe")
+    )
+    client.create_collection(collection_name=qdrant_collection, **collection_config(rag, vector_size))
+    logger.info(
+        f"✓ Created collection {qdrant_collection} (dims={vector_size}, quantization={rag.vector_quantization}, "
+        f"on_disk={rag.vectors_on_disk}, m={rag.hnsw_m}, ef_construct={rag.hnsw_ef_construct})"
+    )
+    ensure_document_index(client, qdrant_collection)
+
+def load_and_index_document(
+    file_path: Path,
+    qdrant_collection: str,
+    document_id: UUID,
+    embedding_dimensions: Optional[int] = None,
+    sparse_vectors: bool = False,
+    embedding_model_name: str = EMBEDDING_MODEL,
+    metrics: Optional[IndexingMetrics] = None,
+    on_progress: Optional[Callable[[IndexingMetrics], None]] = None,
+) -> List[str]:
+    """
+    Stream a file into Qdrant section by section (see rag/loaders.py, rag/ingest.py).
+    Returns the point ids written. Per-stage timings and counters are collected in
+    `metrics`; `on_progress` is called with it as batches finish.
+    """
+    if not  os.path.isfile(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    metrics = metrics or IndexingMetrics()
+    metrics.format = detect_format(str(file_path))
+    metrics.file_bytes = os.path.getsize(file_path)
+
+    def page_read(page, seconds):
+        metrics.add(parse_seconds=seconds, pages=1, chars=len(page.page_content))
+        if metrics.total_pages is None:
+            metrics.total_pages = page.metadata.get("total_pages")
+
+    # Loaders yield one page/section at a time; nothing holds the whole file
+    pages = timed(load_document(str(file_path)), page_read)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", " ", ""]
     )
-    chunks = text_splitter.split_documents(documents=docs)
-    
-    logger.info("Splitting of the documents completed ")
-    # Add metadata
-    for i, chunk in enumerate(chunks):
-        chunk.metadata.update({
-            "source": pdf_name,
-            "chunk_id": i,
-            "total_chunks": len(chunks),
-            "document_id" : str(document_id)
-        })
-    
-    logger.info(f"✓ Created {len(chunks)} chunks")
-    
-    # Create embeddings and index
+    # Time to produce a chunk includes parsing its page; subtract that back out
+    parsed = [0.0]
+
+    def chunk_made(chunk, seconds):
+        metrics.add(split_seconds=seconds - (metrics.parse_seconds - parsed[0]), split_chunks=1)
+        parsed[0] = metrics.parse_seconds
+
+    chunks = timed(iter_chunks(pages, text_splitter, {"document_id": str(document_id)}), chunk_made)
+
     logger.info("Creating embeddings and indexing...")
-    embedding_model = OpenAIEmbeddings(model=EMBEDDING_MODEL)
-    
-    vector_store = QdrantVectorStore.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
-        url=QDRANT_URL,
-        collection_name=COLLECTION_NAME,
-        batch_size=100
+    # Cache hits never reach the limiter; misses wait for the cluster-wide budget (rag/rate_limit.py)
+    limited = RateLimitedEmbeddings(
+        OpenAIEmbeddings(model=embedding_model_name, dimensions=embedding_dimensions, max_retries=0),
+        embedding_model_name,
+    )
+    # Must match the model and size the collection was created with (ensure_collection)
+    embedding_model = CachedChunkEmbeddings(limited, embedding_model_name, embedding_dimensions)
+
+    def batch_done():
+        metrics.embedded_chunks = embedding_model.misses
+        metrics.cached_chunks = embedding_model.hits
+        metrics.embedding_tokens = limited.tokens
+        metrics.throttled_seconds = limited.throttled_seconds
+        if on_progress:
+            on_progress(metrics)
+
+    metrics.stage = "indexing"
+    client = get_qdrant_client()
+    stats = index_chunks(
+        chunks, client, qdrant_collection, embedding_model, sparse_vectors,
+        batch_size=lambda: limited.batch_size(INGEST_BATCH_SIZE),
+        metrics=metrics,
+        on_batch=batch_done,
+    )
+    batch_done()
+    metrics.stage = "cleanup"
+    # A re-index that produced fewer chunks leaves the old tail behind; ids are stable, so drop the rest
+    client.delete(
+        collection_name=qdrant_collection,
+        points_selector=FilterSelector(filter=Filter(
+            must=[FieldCondition(key=DOCUMENT_ID_KEY, match=MatchValue(value=str(document_id)))],
+            must_not=[HasIdCondition(has_id=stats.point_ids)],
+        )),
+    )
+    metrics.stage = "done"
+    metrics.seconds = time.perf_counter() - metrics.started
+
+    logger.info(
+        f"✓ Successfully indexed {stats.chunks} chunks to Qdrant in {metrics.seconds:.1f}s "
+        f"({stats.batches} batches, first upsert after {stats.seconds_to_first_upsert or 0:.1f}s, "
+        f"embedding cache hit rate {embedding_model.hit_rate:.1%}: {embedding_model.hits} cached, "
+        f"{embedding_model.misses} sent to the API; throttled {limited.throttled_seconds:.1f}s, "
+        f"{limited.rate_limited} rate-limited request(s)); "
+        f"parse {metrics.parse_seconds:.1f}s, split {metrics.split_seconds:.1f}s, "
+        f"embed {metrics.embed_seconds:.1f}s, upsert {metrics.upsert_seconds:.1f}s"
     )
-    
-    logger.info(f"✓ Successfully indexed {len(chunks)} chunks to Qdrant")
-    logger.info(f"vector store : {vector_store}")
-    return vector_store
+    return stats.point_ids
 
 
 
 
 
-def upload_ids_to_qdrant(document_id: UUID, collection_name: str, db: Session):
+def prepare_rag_indexing(
+    rag_id: UUID,
+    db: Session,
+    qdrant_collection: str,
+    document_ids: Optional[List[UUID]] = None,
+    task_id: Optional[str] = None,
+) -> List[UUID]:
+    """
+    Mark the RAG as processing and make sure its collection exists. The Document
+    rows are created at upload time; returns `document_ids`, or every pending
+    document of the RAG when none are given. The run (task id, start time,
+    documents) is recorded in rag.indexing_metrics for the progress endpoint.
+    """
+    logger.info("Checking the qdrant connection")
+    validate_qdrant_connection(QDRANT_URL)
+
+    logger.info("Checking if the rag exists")
+    rag = db.query(RAGInstance).filter(RAGInstance.id == rag_id).first()
+    if not rag:
+        raise ValueError("rag not found")
+
+    rag.status = StatusEnum.PROCESSING.value
+    db.commit()
+    db.refresh(rag)
+    rag_cache.store(rag)
+    # Documents are about to change; no cached answer may outlive that
+    invalidate_collection(qdrant_collection)
+    answer_cache.clear(qdrant_collection)
+    ensure_collection(rag, qdrant_collection)
+
+    if document_ids:
+        document_ids = list(document_ids)
+    else:
+        pending = db.query(Document.id).filter(
+            Document.rag_id == rag_id,
+            Document.status == StatusEnum.PENDING.value,
+        ).all()
+        document_ids = [row.id for row in pending]
+    rag.indexing_metrics = {
+        "task_id": task_id,
+        "started_at": datetime.utcnow().isoformat(),
+        "documents": [str(d) for d in document_ids],
+    }
+    db.commit()
+    return document_ids
+
+
+def delete_document_points(qdrant_collection: str, document: Document) -> int:
+    """Remove one document's chunks from Qdrant, by stored point id in batches."""
+    client = get_qdrant_client()
+    point_ids = list(document.qdrant_point_ids or [])
+    for i in range(0, len(point_ids), DELETE_BATCH_SIZE):
+        client.delete(
+            collection_name=qdrant_collection,
+            points_selector=PointIdsList(points=point_ids[i:i + DELETE_BATCH_SIZE]),
+        )
+    # Anything written without a recorded id (e.g. a run that died mid-document)
+    client.delete(
+        collection_name=qdrant_collection,
+        points_selector=FilterSelector(filter=Filter(
+            must=[FieldCondition(key=DOCUMENT_ID_KEY, match=MatchValue(value=str(document.id)))],
+        )),
+    )
+    return len(point_ids)
+
+
+def index_document(
+    document_id: UUID, db: Session, on_progress: Optional[Callable[[IndexingMetrics], None]] = None
+) -> dict:
+    """
+    Index one document into its RAG's collection. Failures are recorded on the
+    Document row instead of raised, so the other documents of the RAG carry on.
+    Stage metrics are saved on the row either way and returned with the status.
+    """
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if not document:
+        logger.error(f"Document {document_id} not found in database!")
+        return {"document_id": str(document_id), "status": StatusEnum.FAILED.value}
+    rag = document.rag_instance
+    metrics = IndexingMetrics()
     try:
-        logger.info(f"Retrieving point IDs for document: {document_id}")
-        qdrant_client = QdrantClient(url=QDRANT_URL)
-        point_ids = []
-        offset = None
-        
-       
-        scroll_filter = Filter(
-            must=[
-                FieldCondition(
-                    key="metadata.document_id",  
-                    match=MatchValue(value=str(document_id))
-                )
-            ]
+        document.status = StatusEnum.PROCESSING.value
+        document.error_message = None
+        db.commit()
+        point_ids = load_and_index_document(
+            document.file_path,
+            rag.qdrant_collection,
+            document_id=document.id,
+            embedding_dimensions=rag.embedding_dimensions,
+            sparse_vectors=bool(rag.sparse_vectors),
+            embedding_model_name=rag.embedding_model or EMBEDDING_MODEL,
+            metrics=metrics,
+            on_progress=on_progress,
         )
-        
-        while True:
-            result, next_offset = qdrant_client.scroll(
-                collection_name=collection_name,
-                scroll_filter=scroll_filter,
-                limit=100,
-                offset=offset,
-                with_payload=True,
-                with_vectors=False
-            )
-            
-            logger.info(f"Found {len(result)} points in this batch")
-            
-            if result and len(point_ids) == 0:  #
-                logger.info(f"Sample point payload: {result[0].payload}")
-            
-            point_ids.extend([point.id for point in result])
-            
-            if next_offset is None:
-                break
-            offset = next_offset
-        
-        logger.info(f"Total points found for document {document_id}: {len(point_ids)}")
-        
-        if not point_ids:
-            logger.warning(f"No points found for document_id: {document_id}")
-            collection_info = qdrant_client.get_collection(collection_name)
-            logger.info(f"Total points in collection '{collection_name}': {collection_info.points_count}")
-            
-           
-        
-        # Update document
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.qdrant_point_ids = point_ids
-            document.total_chunks = len(point_ids)
-            document.processed_at = datetime.utcnow()
-            document.status = "completed"  # Update status
-            db.commit()
-            logger.info(f"Updated document {document_id} with {len(point_ids)} point IDs")
-        else:
-            logger.error(f"Document {document_id} not found in database!")
-        
-        return point_ids
-        
+        document.qdrant_point_ids = point_ids
+        document.total_chunks = len(point_ids)
+        document.processed_at = datetime.utcnow()
+        document.status = StatusEnum.READY.value
+        document.indexing_metrics = metrics.as_dict()
+        db.commit()
     except Exception as e:
-        logger.error(f"Error while retrieving point_ids: {e}", exc_info=True)
+        logger.error(f"Indexing failed for document {document_id}: {e}", exc_info=True)
         db.rollback()
-        return []
-             
-def rag_indexing(rag_id : UUID , db : Session,qdrant_collection:str,id:UUID):
-    # Validate connection
+        # Batches upserted before the failure would otherwise be cited for a FAILED document
+        try:
+            delete_document_points(rag.qdrant_collection, document)
+            document.qdrant_point_ids = []
+            document.total_chunks = 0
+        except Exception as cleanup_error:
+            logger.error(f"Could not remove partial points of document {document_id}: {cleanup_error}")
+        metrics.stage = "failed"
+        metrics.seconds = time.perf_counter() - metrics.started
+        document.status = StatusEnum.FAILED.value
+        document.error_message = str(e)[:2000]
+        document.processed_at = datetime.utcnow()
+        document.indexing_metrics = metrics.as_dict()
+        db.commit()
+    return {"document_id": str(document_id), "status": document.status, "metrics": document.indexing_metrics}
+
+
+def finalize_rag_indexing(
+    rag_id: UUID, db: Session, qdrant_collection: str, document_ids: Optional[List[UUID]] = None
+) -> str:
+    """
+    Runs once every document of the run (`document_ids`, else the ones recorded
+    by prepare_rag_indexing) has finished, successfully or not. The RAG is
+    completed if one of them was indexed or it already had indexed documents,
+    failed otherwise. Documents of an overlapping run don't count either way.
+    """
+    rag = db.query(RAGInstance).filter(RAGInstance.id == rag_id).first()
+    if not rag:
+        raise ValueError("rag not found")
+    documents = db.query(Document).filter(Document.rag_id == rag_id).all()
+    if document_ids is None:
+        document_ids = (rag.indexing_metrics or {}).get("documents") or [d.id for d in documents]
+    in_run = {str(d) for d in document_ids}
+    run = [d for d in documents if str(d.id) in in_run]
+    failed = [d for d in run if d.status == StatusEnum.FAILED.value]
+    succeeded = sum(1 for d in run if d.status == StatusEnum.READY.value)
+    indexed_before = any(d.status == StatusEnum.READY.value for d in documents if str(d.id) not in in_run)
+
+    rag.status = StatusEnum.READY.value if succeeded or indexed_before else StatusEnum.FAILED.value
+    rag.document_count = len(documents)
+    rag.indexing_metrics = run_metrics(rag.indexing_metrics, run)
+    db.commit()
+    rag_cache.store(rag)
+    logger.info(
+        f"Indexing of {qdrant_collection} finished: {succeeded} document(s) indexed, "
+        f"{len(failed)} failed {[d.filename for d in failed]}"
+    )
+    # Queries cached against the old contents must not survive a re-index
+    invalidate_collection(qdrant_collection)
+    answer_cache.clear(qdrant_collection)
+    return rag.status
+
+
+def run_metrics(run: Optional[dict], indexed: List[Document]) -> dict:
+    """Close a run recorded by prepare_rag_indexing: totals and rates over the documents it indexed."""
+    run = dict(run or {})
+    finished = datetime.utcnow()
     try:
-     logger.info("Checking the qdrant connection")
-     validate_qdrant_connection(QDRANT_URL)
-    
-     logger.info("Checking if the rag exists")
-     rag= db.query(RAGInstance).filter(RAGInstance.id == rag_id).first()
-    
-     if not rag:
-         raise ValueError("rag not found")
-    
-     rag.status = "processing"
-     db.commit()
-     db.refresh(rag) 
-     
-    # Index PDF
-     folder_path = f"uploads/{rag_id}"
-     logger.info("File indexing is started")
-     document_ids = []
-     for doc in os.listdir(folder_path):
-         pdf_path = os.path.join(folder_path,doc)
-         
-         size = os.path.getsize(pdf_path)
-         #Saved the document in the document model and get the id of that document for indexing meta data
-         base_name = os.path.basename(pdf_path)
-         name_no_ext, ext = os.path.splitext(base_name)
-         new_document = Document(
-            rag_id=rag_id,
-            user_id= id,
-            filename=name_no_ext,
-            file_path=pdf_path,
-            file_type=[ext.lstrip(".")] if ext else [],
-            file_size=size,
-            status="pending"
-         )
-         db.add(new_document)
-         db.commit()
-         db.refresh(new_document)
-         document_ids.append(new_document.id)
-         vector_store = load_and_index_pdf(pdf_path,qdrant_collection,document_id=new_document.id)
-      
-     logger.info("Indexing complete!")
-     
-     logger.info("Uploading the point_ids to the document model") 
-     for document_id in document_ids:
-         ids=    upload_ids_to_qdrant(collection_name=qdrant_collection,document_id=document_id,db=db)
-         
-     logger.info(f"Uploading of the point_ids completed ! {ids}")      
-     
-     rag.status="completed"
-     db.commit()
-     db.refresh(rag)
-    
-     
-     
-    except Exception as e:
-        logger.info(f"Error occured while indexing the documnet {e}")
-        
\ No newline at end of file
+        seconds = (finished - datetime.fromisoformat(run["started_at"])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        seconds = 0.0
+    run.update({
+        "finished_at": finished.isoformat(),
+        "completed": sum(1 for d in indexed if d.status == StatusEnum.READY.value),
+        "failed": sum(1 for d in indexed if d.status == StatusEnum.FAILED.value),
+        "totals": summarize([d.indexing_metrics or {} for d in indexed], seconds),
+    })
+    return run
+
+
+def mark_rag_failed(rag_id: UUID, db: Session) -> None:
+    db.rollback()
+    rag = db.query(RAGInstance).filter(RAGInstance.id == rag_id).first()
+    if rag:
+        rag.status = StatusEnum.FAILED.value
+        db.commit()
+        rag_cache.store(rag)
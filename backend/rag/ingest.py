@@ -0,0 +1,149 @@
+"""Streaming ingestion: pages -> chunks -> embedding batches -> Qdrant upserts.
+
+Nothing is materialised for the whole file. Pages are pulled from the loader
+one at a time, split as they arrive, and grouped into batches of
+INGEST_BATCH_SIZE chunks (or as many as the rate limiter says fill one
+embeddings request). Each batch is embedded and upserted by a worker
+thread, with INGEST_EMBED_CONCURRENCY batches worked on at once, so one
+batch's upsert overlaps the next batches' embedding calls. The producer
+stops reading pages while INGEST_WINDOW batches are unfinished, which caps
+memory at roughly INGEST_WINDOW * INGEST_BATCH_SIZE chunks and their vectors.
+"""
+
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document as LCDocument
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import TextSplitter
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, SparseVector
+
+from rag.metrics import IndexingMetrics
+from rag.sparse import SPARSE_VECTOR_NAME, encode_document
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Splitter settings used for every RAG; neighbouring chunks share up to CHUNK_OVERLAP chars
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 200
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))  # chunks per embedding request
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))  # batches being embedded/upserted
+INGEST_WINDOW = int(os.getenv("INGEST_WINDOW", "8"))  # unfinished batches before the reader waits
+
+# Same payload layout QdrantVectorStore writes and the query path reads
+CONTENT_KEY = "page_content"
+METADATA_KEY = "metadata"
+
+
+def point_id(document_id: str, chunk_id: int) -> str:
+    """Stable id for a chunk, so re-indexing a document overwrites its points in place."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document_id}:{chunk_id}"))
+
+
+@dataclass
+class IngestStats:
+    chunks: int = 0
+    point_ids: List[str] = field(default_factory=list)
+    batches: int = 0
+    seconds_to_first_upsert: Optional[float] = None
+    seconds: float = 0.0
+
+
+def iter_chunks(pages: Iterable[LCDocument], splitter: TextSplitter, metadata: Dict) -> Iterator[LCDocument]:
+    """Split pages as they are loaded; chunk_id keeps counting across pages."""
+    chunk_id = 0
+    for page in pages:
+        for chunk in splitter.split_documents([page]):
+            chunk.metadata.update(metadata)
+            chunk.metadata["chunk_id"] = chunk_id
+            chunk_id += 1
+            yield chunk
+
+
+def _batches(chunks: Iterable[LCDocument], size: Callable[[], int]) -> Iterator[List[LCDocument]]:
+    """`size` is asked again for every batch, so it can follow the rate limiter."""
+    it = iter(chunks)
+    while batch := list(islice(it, max(1, size()))):
+        yield batch
+
+
+def _points(batch: List[LCDocument], vectors: List[List[float]], sparse_vectors: bool) -> List[PointStruct]:
+    points = []
+    for chunk, vector in zip(batch, vectors):
+        if sparse_vectors:
+            sparse = encode_document(chunk.page_content)
+            vector = {"": vector, SPARSE_VECTOR_NAME: SparseVector(indices=sparse.indices, values=sparse.values)}
+        points.append(PointStruct(
+            id=point_id(chunk.metadata["document_id"], chunk.metadata["chunk_id"]),
+            vector=vector,
+            payload={CONTENT_KEY: chunk.page_content, METADATA_KEY: chunk.metadata},
+        ))
+    return points
+
+
+def index_chunks(
+    chunks: Iterable[LCDocument],
+    client: QdrantClient,
+    collection_name: str,
+    embeddings: Embeddings,
+    sparse_vectors: bool = False,
+    batch_size: Optional[Callable[[], int]] = None,
+    metrics: Optional[IndexingMetrics] = None,
+    on_batch: Optional[Callable[[], None]] = None,
+) -> IngestStats:
+    """
+    Embed and upsert a stream of chunks with bounded memory. Raises on the first
+    failed batch. `batch_size` overrides INGEST_BATCH_SIZE per batch; embedding
+    and upsert timings go to `metrics`, and `on_batch` is called after each
+    finished batch.
+    """
+    stats = IngestStats()
+    metrics = metrics or IndexingMetrics()
+    started = time.perf_counter()
+
+    def work(batch: List[LCDocument]) -> List[str]:
+        t0 = time.perf_counter()
+        vectors = embeddings.embed_documents([c.page_content for c in batch])
+        t1 = time.perf_counter()
+        points = _points(batch, vectors, sparse_vectors)
+        client.upsert(collection_name=collection_name, points=points, wait=True)
+        metrics.add(embed_seconds=t1 - t0, chunks=len(points), batches=1)
+        metrics.record_upsert(time.perf_counter() - t1)
+        if stats.seconds_to_first_upsert is None:
+            stats.seconds_to_first_upsert = time.perf_counter() - started
+        return [p.id for p in points]
+
+    def collect(future) -> None:
+        stats.point_ids += future.result()
+        if on_batch:
+            on_batch()
+
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max(1, INGEST_EMBED_CONCURRENCY), thread_name_prefix="ingest") as pool:
+        try:
+            for batch in _batches(chunks, batch_size or (lambda: INGEST_BATCH_SIZE)):
+                if len(window) >= max(1, INGEST_WINDOW):
+                    collect(window.popleft())
+                window.append(pool.submit(work, batch))
+                stats.batches += 1
+            while window:
+                collect(window.popleft())
+        except BaseException:
+            for future in window:
+                future.cancel()
+            raise
+
+    stats.chunks = len(stats.point_ids)
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -0,0 +1,262 @@
+"""Document loaders, chosen by sniffed content and then by extension.
+
+Every loader yields LangChain documents lazily, one page or section at a
+time, with the metadata the context builder cites: `source` and
+`page_label` (the page number for PDF/DOCX, the heading for Markdown, the
+section number for plain text).
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Tuple
+from xml.etree.ElementTree import iterparse
+
+import pypdf
+from dotenv import load_dotenv
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document as LCDocument
+
+from rag.pdf_extract import extract_pages
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Plain text/Markdown sections are cut at a line boundary after this many characters
+TEXT_SECTION_CHARS = int(os.getenv("TEXT_SECTION_CHARS", "65536"))
+SNIFF_BYTES = 8192
+# Large PDFs are extracted in parallel page ranges on one pool per worker process, shared by all
+# indexing threads; below the threshold process startup isn't worth it
+PDF_EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "16"))
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+Loader = Callable[[str], Iterator[LCDocument]]
+LOADERS: Dict[str, Loader] = {}
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def register_loader(fmt: str) -> Callable[[Loader], Loader]:
+    def wrap(fn: Loader) -> Loader:
+        LOADERS[fmt] = fn
+        return fn
+    return wrap
+
+
+def detect_format(path: str) -> str:
+    """Decide from the file's first bytes; the extension only separates Markdown from plain text."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(path) as z:
+            if "word/document.xml" in z.namelist():
+                return "docx"
+        raise ValueError(f"{os.path.basename(path)} is a zip archive but not a .docx file")
+    if b"\x00" in head:
+        raise ValueError(f"{os.path.basename(path)} looks binary and is not a supported format")
+    ext = os.path.splitext(path)[1].lower()
+    return "markdown" if ext in (".md", ".markdown") else "text"
+
+
+def load_document(path: str) -> Iterator[LCDocument]:
+    fmt = detect_format(path)
+    logger.info(f"Loading {path} as {fmt}")
+    return LOADERS[fmt](path)
+
+
+def _source(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _pdf_pool_context():
+    # forkserver: forking the worker directly would copy its embedding threads' locks
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["rag.pdf_extract"])
+    return ctx
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """One extraction pool per worker process, shared by every indexing thread."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_PROCESSES, mp_context=_pdf_pool_context())
+        return _pdf_pool
+
+
+def _discard_pdf_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next large PDF starts a fresh one."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parallel_pages(path: str, total: int) -> Iterator[Tuple[int, str, str]]:
+    """
+    Extract page ranges on the shared process pool and yield (page, text, label)
+    in page order. Only PDF_EXTRACT_PROCESSES * 2 shards of this file are in
+    flight, so results don't pile up ahead of the consumer. Falls back to this
+    process if the pool can't run.
+    """
+    shards = [(start, min(start + PDF_SHARD_PAGES, total)) for start in range(0, total, PDF_SHARD_PAGES)]
+    next_page = 0
+    pool = None
+    window = deque()
+    try:
+        pool = _get_pdf_pool()
+        queued = iter(shards)
+        for start, stop in islice(queued, PDF_EXTRACT_PROCESSES * 2):
+            window.append((start, pool.submit(extract_pages, path, start, stop)))
+        while window:
+            start, future = window.popleft()
+            pages = future.result()
+            for shard in islice(queued, 1):
+                window.append((shard[0], pool.submit(extract_pages, path, *shard)))
+            for offset, (text, label) in enumerate(pages):
+                yield start + offset, text, label
+            next_page = start + len(pages)
+    except (AssertionError, OSError, BrokenProcessPool) as e:
+        if pool is not None:
+            _discard_pdf_pool(pool)
+        logger.warning(f"PDF process pool unavailable ({e}); extracting {path} from page {next_page} in-process")
+        for offset, (text, label) in enumerate(extract_pages(path, next_page, total)):
+            yield next_page + offset, text, label
+    finally:
+        # The pool outlives this file; don't leave its remaining shards queued on it
+        for _, future in window:
+            future.cancel()
+
+
+@register_loader("pdf")
+def load_pdf(path: str) -> Iterator[LCDocument]:
+    """
+    Small PDFs are parsed page by page in this process. From PDF_PARALLEL_MIN_PAGES
+    pages up, page ranges are extracted on PDF_EXTRACT_PROCESSES cores.
+    """
+    source = _source(path)
+    total = len(pypdf.PdfReader(path).pages)
+    # Daemonic processes (Celery prefork children) may not have children of their own
+    parallel = PDF_EXTRACT_PROCESSES >= 2 and not multiprocessing.current_process().daemon
+    if total < PDF_PARALLEL_MIN_PAGES or not parallel:
+        # lazy_load parses one page at a time; PyPDFLoader already sets page_label
+        for page in PyPDFLoader(file_path=path).lazy_load():
+            page.metadata["source"] = source
+            page.metadata.setdefault("page_label", str(page.metadata.get("page", 0) + 1))
+            yield page
+        return
+
+    logger.info(f"Extracting {total} pages of {path} with {PDF_EXTRACT_PROCESSES} processes")
+    for page, text, label in _parallel_pages(path, total):
+        yield LCDocument(
+            page_content=text,
+            metadata={"source": source, "page": page, "page_label": label, "total_pages": total},
+        )
+
+
+@register_loader("text")
+def load_text(path: str) -> Iterator[LCDocument]:
+    """Stream the file line by line; sections never hold more than ~TEXT_SECTION_CHARS."""
+    source = _source(path)
+    section, size, n = [], 0, 1
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            section.append(line)
+            size += len(line)
+            if size >= TEXT_SECTION_CHARS:
+                yield LCDocument(page_content="".join(section), metadata={"source": source, "page_label": str(n)})
+                section, size, n = [], 0, n + 1
+    if section:
+        yield LCDocument(page_content="".join(section), metadata={"source": source, "page_label": str(n)})
+
+
+@register_loader("markdown")
+def load_markdown(path: str) -> Iterator[LCDocument]:
+    """One section per heading (headings inside code fences don't count); page_label is the heading."""
+    source = _source(path)
+    heading, section, size, in_fence = "", [], 0, False
+
+    def emit():
+        text = "".join(section)
+        if text.strip():
+            return LCDocument(page_content=text, metadata={"source": source, "page_label": heading or "?", "section": heading})
+        return None
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if _FENCE_RE.match(line):
+                in_fence = not in_fence
+            match = None if in_fence else _HEADING_RE.match(line)
+            if match or size >= TEXT_SECTION_CHARS:
+                doc = emit()
+                if doc:
+                    yield doc
+                section, size = [], 0
+                if match:
+                    heading = match.group(2)
+            section.append(line)
+            size += len(line)
+    doc = emit()
+    if doc:
+        yield doc
+
+
+@register_loader("docx")
+def load_docx(path: str) -> Iterator[LCDocument]:
+    """
+    Parse word/document.xml incrementally. Pages follow Word's page breaks
+    (explicit and last-rendered), so page_label matches what the author saw.
+    """
+    source = _source(path)
+    page, paragraphs, runs = 1, [], []
+
+    def flush(page_no: int):
+        text = "\n".join(p for p in paragraphs if p.strip())
+        return LCDocument(page_content=text, metadata={"source": source, "page_label": str(page_no)}) if text else None
+
+    with zipfile.ZipFile(path) as z, z.open("word/document.xml") as xml:
+        for event, el in iterparse(xml, events=("start", "end")):
+            tag = el.tag
+            if event == "start":
+                if tag == f"{_W}lastRenderedPageBreak" or (tag == f"{_W}br" and el.get(f"{_W}type") == "page"):
+                    paragraphs.append("".join(runs))
+                    runs = []
+                    doc = flush(page)
+                    # Word often marks one break twice (explicit + rendered); a page needs text to count
+                    if doc:
+                        yield doc
+                        page += 1
+                    paragraphs = []
+                continue
+            if tag == f"{_W}t":
+                runs.append(el.text or "")
+            elif tag == f"{_W}tab":
+                runs.append("\t")
+            elif tag in (f"{_W}br", f"{_W}cr") and el.get(f"{_W}type") != "page":
+                runs.append("\n")
+            elif tag == f"{_W}p":
+                paragraphs.append("".join(runs))
+                runs = []
+                el.clear()  # keep memory flat on long documents
+    doc = flush(page)
+    if doc:
+        yield doc
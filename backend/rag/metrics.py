@@ -0,0 +1,141 @@
+"""Per-stage counters and timings for indexing one document.
+
+The stages overlap (pages are parsed while earlier batches are embedded and
+upserted), so each *_seconds is the time spent inside that stage, not a
+slice of the wall clock. The stage with the largest share of `seconds` is
+the bottleneck.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Formats whose extracted characters track the bytes read closely enough for a progress estimate
+_TEXT_FORMATS = ("text", "markdown")
+
+
+@dataclass
+class IndexingMetrics:
+    format: str = ""
+    file_bytes: int = 0
+    total_pages: Optional[int] = None
+    stage: str = "loading"  # loading -> indexing -> cleanup -> done / failed
+    pages: int = 0
+    chars: int = 0
+    split_chunks: int = 0  # produced by the splitter; `chunks` counts the upserted ones
+    chunks: int = 0
+    batches: int = 0
+    upserts: int = 0
+    embedded_chunks: int = 0  # sent to the embeddings API
+    cached_chunks: int = 0  # served by the chunk embedding cache
+    embedding_tokens: int = 0
+    parse_seconds: float = 0.0
+    split_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    upsert_latency_max: float = 0.0
+    throttled_seconds: float = 0.0
+    seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **amounts: float) -> None:
+        """Thread-safe increments; embedding and upserts run on the ingest pool."""
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def record_upsert(self, seconds: float) -> None:
+        with self._lock:
+            self.upserts += 1
+            self.upsert_seconds += seconds
+            self.upsert_latency_max = max(self.upsert_latency_max, seconds)
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Share of the file read so far, when it can be told."""
+        if self.stage in ("cleanup", "done"):
+            return 1.0
+        if self.total_pages:
+            read = min(1.0, self.pages / self.total_pages)
+        elif self.format in _TEXT_FORMATS and self.file_bytes:
+            read = min(0.99, self.chars / self.file_bytes)
+        else:
+            return None
+        # The reader runs ahead of embedding by up to INGEST_WINDOW batches; count only what is stored
+        return read * (self.chunks / self.split_chunks) if self.split_chunks else 0.0
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            elapsed = self.seconds or (time.perf_counter() - self.started)
+            fraction = self.fraction
+            return {
+                "stage": self.stage,
+                "format": self.format,
+                "file_bytes": self.file_bytes,
+                "total_pages": self.total_pages,
+                "fraction": round(fraction, 4) if fraction is not None else None,
+                "pages": self.pages,
+                "chunks": self.chunks,
+                "batches": self.batches,
+                "upserts": self.upserts,
+                "embedded_chunks": self.embedded_chunks,
+                "cached_chunks": self.cached_chunks,
+                "embedding_tokens": self.embedding_tokens,
+                "seconds": round(elapsed, 3),
+                "parse_seconds": round(self.parse_seconds, 3),
+                "split_seconds": round(self.split_seconds, 3),
+                "embed_seconds": round(self.embed_seconds, 3),
+                "upsert_seconds": round(self.upsert_seconds, 3),
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "upsert_latency_avg": round(self.upsert_seconds / self.upserts, 4) if self.upserts else None,
+                "upsert_latency_max": round(self.upsert_latency_max, 4),
+                "pages_per_second": round(self.pages / elapsed, 2) if elapsed else 0.0,
+                "chunks_per_second": round(self.chunks / elapsed, 2) if elapsed else 0.0,
+                "bytes_per_second": round(self.file_bytes * (fraction or 0) / elapsed) if elapsed else 0,
+            }
+
+
+def timed(items: Iterable[T], on_item: Callable[[T, float], None]) -> Iterator[T]:
+    """Yield from `items`, reporting each item with the seconds it took to produce."""
+    it = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        on_item(item, time.perf_counter() - start)
+        yield item
+
+
+# Fields that add up across documents; finalize sums these for the RAG
+SUMMED = (
+    "file_bytes", "pages", "chunks", "batches", "upserts", "embedded_chunks", "cached_chunks", "embedding_tokens",
+    "parse_seconds", "split_seconds", "embed_seconds", "upsert_seconds", "throttled_seconds",
+)
+
+
+def summarize(documents: Iterable[Dict], seconds: float) -> Dict:
+    """Totals over per-document metrics, with rates against the run's wall clock."""
+    totals = {name: 0 for name in SUMMED}
+    latency_max = 0.0
+    for m in documents:
+        for name in SUMMED:
+            totals[name] += m.get(name) or 0
+        latency_max = max(latency_max, m.get("upsert_latency_max") or 0.0)
+    for name in SUMMED:
+        if name.endswith("_seconds"):
+            totals[name] = round(totals[name], 3)
+    totals.update({
+        "seconds": round(seconds, 3),
+        "upsert_latency_avg": round(totals["upsert_seconds"] / totals["upserts"], 4) if totals["upserts"] else None,
+        "upsert_latency_max": round(latency_max, 4),
+        "pages_per_second": round(totals["pages"] / seconds, 2) if seconds else 0.0,
+        "chunks_per_second": round(totals["chunks"] / seconds, 2) if seconds else 0.0,
+        "bytes_per_second": round(totals["file_bytes"] / seconds) if seconds else 0,
+    })
+    return totals
@@ -0,0 +1,16 @@
+"""Page-range text extraction for the PDF process pool.
+
+Kept apart from rag/loaders.py so pool processes only import pypdf, not
+LangChain; the forkserver preloads this module once and forks workers from it.
+"""
+
+from typing import List, Tuple
+
+import pypdf
+
+
+def extract_pages(path: str, start: int, stop: int) -> List[Tuple[str, str]]:
+    """(text, page_label) for pages [start, stop). Each call opens its own reader."""
+    reader = pypdf.PdfReader(path)
+    labels = reader.page_labels
+    return [(reader.pages[i].extract_text(extraction_mode="plain").strip(), labels[i]) for i in range(start, stop)]
@@ -1,138 +1,278 @@
-import os, time
-from typing import List, Dict
+import os, asyncio
+from typing import AsyncIterator, List, Dict, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI, APIError, RateLimitError, APITimeoutError
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
+from openai import AsyncOpenAI, APIError, RateLimitError, APITimeoutError
+import numpy as np
+from qdrant_client.models import Fusion, FusionQuery, Prefetch, QueryRequest, SparseVector
+from langchain_core.documents import Document
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
 import sys
+import logging
+from rag.registry import get_async_qdrant_client, get_embeddings
+from rag import answer_cache
+from rag.context import PackedContext, aget_encoding, pack_context
+from rag.storage import search_params
+from rag.profile import RetrievalProfile
+from rag.sparse import SPARSE_VECTOR_NAME, encode_query, tokenize
+from models.raginstance_model import RetrievalModeEnum
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 # ---- Config
 QDRANT_URL         = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY     = os.getenv("QDRANT_API_KEY")  # optional
 
-CHAT_MODEL         = os.getenv("CHAT_MODEL", "gpt-4o-mini")
-TOP_K              = int(os.getenv("TOP_K", "4"))
-MAX_CONTEXT_CHARS  = int(os.getenv("MAX_CONTEXT_CHARS", "8000"))  # simple budget
+# k, models and the context budget come from each RAG's RetrievalProfile (rag/profile.py)
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))  # chat completions in flight per batch
+HYBRID_PREFETCH_FACTOR = int(os.getenv("HYBRID_PREFETCH_FACTOR", "4"))  # candidates per branch = k * this
+MMR_FETCH_FACTOR = int(os.getenv("MMR_FETCH_FACTOR", "4"))  # candidates re-ranked by MMR = k * this
+
+NO_ANSWER = (
+    "I don't know based on the provided documents. "
+    "Try broadening the query or indexing more sources on this topic."
+)
+SYSTEM_MSG = "You are a rag agent. Reply based on information you get."
 
 # ---- Clients
-openai_client = OpenAI()
-def _build_context(results) -> tuple[str, List[Dict]]:
-    """Build a readable context block and collect citations metadata."""
-    parts, citations = [], []
-    for i, d in enumerate(results, 1):
-        m = d.metadata or {}
-        page = m.get("page_label") or m.get("page") or m.get("page_number") or "?"
-        src  = m.get("source") or m.get("file") or m.get("path") or "?"
-        parts.append(f"Chunk {i} — page {page} — {src}\n{d.page_content}")
-        citations.append({"chunk": i, "page": page, "source": src})
-    context = "\n\n---\n\n".join(parts)
-
-    # crude budget to avoid gigantic prompts
-    if len(context) > MAX_CONTEXT_CHARS:
-        context = context[:MAX_CONTEXT_CHARS] + "\n\n... [truncated]"
-    return context, citations
-
-def _chat_with_retry(messages, max_retries=3, timeout=60):
+async_openai_client = AsyncOpenAI()
+async def _build_context(results, profile: RetrievalProfile) -> PackedContext:
+    """Pack retrieved chunks into a numbered context block within the RAG's token budget."""
+    enc = await aget_encoding(profile.llm_model)  # the first load may download; not on the loop
+    packed = pack_context(results, profile.llm_model, profile.context_token_budget, enc)
+    logger.info(
+        f"Context: {packed.tokens_used} tokens used, {packed.tokens_saved} saved by merging overlap, "
+        f"{packed.chunks_dropped} block(s) over budget"
+    )
+    return packed
+
+def _build_messages(query: str, context: str) -> List[Dict]:
+    return [
+        {"role": "system", "content": SYSTEM_MSG},
+        {"role": "user", "content": f"CONTEXT (numbered chunks):\n{context}\n\nQUESTION:\n{query}"},
+    ]
+
+
+async def _achat_with_retry(messages, model, max_retries=3, timeout=60):
     for attempt in range(1, max_retries + 1):
         try:
-            return openai_client.chat.completions.create(
-                model=CHAT_MODEL,
+            return await async_openai_client.chat.completions.create(
+                model=model,
                 temperature=0.2,
                 messages=messages,
                 timeout=timeout,
             )
-        except (RateLimitError, APITimeoutError, APIError) as e:
+        except (RateLimitError, APITimeoutError, APIError):
             if attempt == max_retries:
                 raise
-            time.sleep(min(2 ** attempt, 10))  # exponential backoff
+            await asyncio.sleep(min(2 ** attempt, 10))
 
 
-def process_query_stream(query: str, collection_name: str, embedding: str):
-    """
-    Same as process_query but streams the LLM response token-by-token.
-    Yields text chunks (str) as they arrive from the API.
-    """
-    emb = OpenAIEmbeddings(model=embedding)
-    vs = QdrantVectorStore.from_existing_collection(
-        collection_name=collection_name,
-        embedding=emb,
-        url=QDRANT_URL,
-        api_key=QDRANT_API_KEY,
+def resolve_retrieval_mode(requested: str, query: str, sparse_available: bool) -> str:
+    """Pick dense/sparse/hybrid for a query. Collections without BM25 vectors are always dense."""
+    if not sparse_available:
+        return RetrievalModeEnum.DENSE.value
+    mode = requested or RetrievalModeEnum.AUTO.value
+    if mode == RetrievalModeEnum.AUTO.value:
+        # Even identifier-looking queries keep the dense leg: a digit or a code in a
+        # short question ("what is O(n2) sorting") says little about how it is best matched
+        mode = RetrievalModeEnum.HYBRID.value
+    if mode != RetrievalModeEnum.DENSE.value and not tokenize(query):
+        return RetrievalModeEnum.DENSE.value  # nothing lexical to match on
+    return mode
+
+
+def _use_mmr(profile: RetrievalProfile, query_vector) -> bool:
+    # MMR needs the query's dense vector; pure-sparse searches skip it
+    return profile.mmr_lambda is not None and query_vector is not None
+
+
+def _query_request(query: str, query_vector, mode: str, profile: RetrievalProfile) -> QueryRequest:
+    params = search_params(profile.quantization)
+    mmr = _use_mmr(profile, query_vector)
+    limit = profile.k * MMR_FETCH_FACTOR if mmr else profile.k
+    with_vector = [""] if mmr else False  # the unnamed dense vector, for the diversity term
+    if mode == RetrievalModeEnum.DENSE.value:
+        return QueryRequest(
+            query=query_vector,
+            params=params,
+            score_threshold=profile.score_threshold,
+            limit=limit,
+            with_payload=True,
+            with_vector=with_vector,
+        )
+
+    sparse = encode_query(query)
+    sparse_query = SparseVector(indices=sparse.indices, values=sparse.values)
+    if mode == RetrievalModeEnum.SPARSE.value:
+        return QueryRequest(query=sparse_query, using=SPARSE_VECTOR_NAME, limit=limit, with_payload=True)
+
+    # hybrid: both branches over-fetch, then reciprocal-rank fusion picks the final k.
+    # The cosine threshold only makes sense on the dense branch; RRF scores are rank-based.
+    return QueryRequest(
+        prefetch=[
+            Prefetch(
+                query=query_vector,
+                params=params,
+                score_threshold=profile.score_threshold,
+                limit=limit * HYBRID_PREFETCH_FACTOR,
+            ),
+            Prefetch(query=sparse_query, using=SPARSE_VECTOR_NAME, limit=limit * HYBRID_PREFETCH_FACTOR),
+        ],
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=limit,
+        with_payload=True,
+        with_vector=with_vector,
+    )
+
+
+def _select(points, query_vector, profile: RetrievalProfile) -> List[Document]:
+    """Trim the candidates to k, re-ranking with MMR when the RAG asks for it."""
+    if _use_mmr(profile, query_vector) and len(points) > profile.k:
+        vectors = [p.vector.get("") if isinstance(p.vector, dict) else p.vector for p in points]
+        if all(v is not None for v in vectors):
+            order = maximal_marginal_relevance(
+                np.asarray(query_vector, dtype=np.float32),
+                vectors,
+                lambda_mult=profile.mmr_lambda,
+                k=profile.k,
+            )
+            points = [points[i] for i in order]
+    return _to_documents(points[:profile.k])
+
+
+async def _asearch(profile: RetrievalProfile, requests: List[QueryRequest], query_vectors: List) -> List[List[Document]]:
+    """One Qdrant round trip for any number of searches, returning LangChain-shaped documents."""
+    if not requests:
+        return []
+    responses = await get_async_qdrant_client().query_batch_points(
+        collection_name=profile.collection_name,
+        requests=requests,
     )
-    results = vs.similarity_search(query=query, k=TOP_K)
+    return [_select(r.points, v, profile) for r, v in zip(responses, query_vectors)]
+
+
+def _to_documents(points) -> List[Document]:
+    # Payload layout written by QdrantVectorStore: {"page_content": ..., "metadata": {...}}
+    return [
+        Document(page_content=p.payload.get("page_content", ""), metadata=p.payload.get("metadata") or {})
+        for p in points
+    ]
+
+
+async def aprocess_query(query: str, profile: RetrievalProfile, mode: str = "dense") -> Dict:
+    """Answer one question; no thread is held while waiting on OpenAI or Qdrant."""
+    generation = await answer_cache.acurrent_generation(profile.collection_name)
+    query_vector = None
+    if mode != RetrievalModeEnum.SPARSE.value:
+        query_vector = await get_embeddings(profile.embedding_model, profile.embedding_dimensions).aembed_query(query)
+        cached = await answer_cache.alookup(profile.collection_name, profile.llm_model, query_vector, generation)
+        if cached:
+            return cached
+
+    [results] = await _asearch(profile, [_query_request(query, query_vector, mode, profile)], [query_vector])
     if not results:
-        fallback = (
-            "I don't know based on the provided documents. "
-            "Try broadening the query or indexing more sources on this topic."
-        )
-        yield fallback
+        return {"answer": NO_ANSWER, "citations": [], "used_k": 0}
+
+    packed = await _build_context(results, profile)
+    resp = await _achat_with_retry(_build_messages(query, packed.text), profile.llm_model)
+    result = {"answer": resp.choices[0].message.content.strip(), **packed.stats()}
+    await answer_cache.astore(profile.collection_name, profile.llm_model, query, query_vector, result, generation)
+    return result
+
+
+async def aprocess_query_stream(query: str, profile: RetrievalProfile, mode: str = "dense") -> AsyncIterator[str]:
+    """Same as aprocess_query, but yields the answer text as it streams from the API."""
+    generation = await answer_cache.acurrent_generation(profile.collection_name)
+    query_vector = None
+    if mode != RetrievalModeEnum.SPARSE.value:
+        query_vector = await get_embeddings(profile.embedding_model, profile.embedding_dimensions).aembed_query(query)
+        cached = await answer_cache.alookup(profile.collection_name, profile.llm_model, query_vector, generation)
+        if cached:
+            for piece in answer_cache.replay(cached["answer"]):
+                yield piece
+            return
+
+    [results] = await _asearch(profile, [_query_request(query, query_vector, mode, profile)], [query_vector])
+    if not results:
+        yield NO_ANSWER
         return
-    context, citations = _build_context(results)
-    if len(context) > MAX_CONTEXT_CHARS:
-        context = context[:MAX_CONTEXT_CHARS] + "\n\n... [truncated]"
-    system_msg = "You are a rag agent. Reply based on information you get."
-    messages = [
-        {"role": "system", "content": system_msg},
-        {"role": "user", "content": f"CONTEXT (numbered chunks):\n{context}\n\nQUESTION:\n{query}"},
-    ]
-    stream = openai_client.chat.completions.create(
-        model=CHAT_MODEL,
+
+    packed = await _build_context(results, profile)
+    stream = await async_openai_client.chat.completions.create(
+        model=profile.llm_model,
         temperature=0.2,
-        messages=messages,
+        messages=_build_messages(query, packed.text),
         stream=True,
         timeout=60,
     )
-    for chunk in stream:
+    parts = []
+    async for chunk in stream:
         if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
             yield chunk.choices[0].delta.content
+    await answer_cache.astore(profile.collection_name, profile.llm_model, query, query_vector, {"answer": "".join(parts).strip()}, generation)
 
 
-def process_query(query: str,collection_name:str,embedding:str) -> Dict:
-    
-    emb = OpenAIEmbeddings(model=embedding)
-
-    vs = QdrantVectorStore.from_existing_collection(
-      collection_name=collection_name,
-      embedding=emb,
-       url=QDRANT_URL,
-       api_key=QDRANT_API_KEY,
-)
-
-    results = vs.similarity_search(query=query, k=TOP_K)
-    print("rag result is this",results)
-    if not results:
-        return {
-            "answer": (
-                "I don't know based on the provided documents. "
-                "Try broadening the query or indexing more sources on this topic."
-            ),
-            "citations": [],
-            "used_k": 0,
-        }
 
-    context, citations = _build_context(results)  # your existing helper (numbered chunks)
+async def aprocess_query_batch(
+    queries: List[str],
+    profile: RetrievalProfile,
+    concurrency: int = ASK_BATCH_CONCURRENCY,
+    modes: List[str] = None,
+) -> AsyncIterator[Tuple[int, Dict]]:
+    """
+    Answer many questions against one RAG. All queries are embedded in one request
+    and retrieved in one Qdrant batch search; chat completions run with at most
+    `concurrency` in flight. Yields (index, result) as each answer finishes.
+    """
+    modes = modes or [RetrievalModeEnum.DENSE.value] * len(queries)
+    generation = await answer_cache.acurrent_generation(profile.collection_name)
+    dense = [i for i, m in enumerate(modes) if m != RetrievalModeEnum.SPARSE.value]
+    vectors = [None] * len(queries)
+    if dense:
+        embedded = await get_embeddings(profile.embedding_model, profile.embedding_dimensions).aembed_queries([queries[i] for i in dense])
+        for i, v in zip(dense, embedded):
+            vectors[i] = v
+    cached = await asyncio.gather(*(
+        answer_cache.alookup(profile.collection_name, profile.llm_model, vectors[i], generation) for i in dense
+    ))
+    hits = {i: hit for i, hit in zip(dense, cached) if hit}
+    pending = []
+    for i in range(len(queries)):
+        if i in hits:
+            yield i, hits[i]
+        else:
+            pending.append(i)
 
-    system_msg = (
-        "You are a rag agnet .Replay based on information u get ."
+    results = await _asearch(
+        profile,
+        [_query_request(queries[i], vectors[i], modes[i], profile) for i in pending],
+        [vectors[i] for i in pending],
     )
-    print("context",context)
-    messages = [
-        {"role": "system", "content": system_msg},
-        {
-            "role": "user",
-            "content": f"CONTEXT (numbered chunks):\n{context}\n\nQUESTION:\n{query}"
-        },
-    ]
-
-    resp = _chat_with_retry(messages)
-    answer = resp.choices[0].message.content.strip()
-    print("answer of ai ",answer)
-    # Optional: post-check – if no [n] citations appear, downrank/flag
+    semaphore = asyncio.Semaphore(max(1, concurrency))
 
+    async def answer(i: int, docs: List[Document]) -> Tuple[int, Dict]:
+        if not docs:
+            return i, {"answer": NO_ANSWER, "citations": [], "used_k": 0}
+        packed = await _build_context(docs, profile)
+        try:
+            async with semaphore:
+                resp = await _achat_with_retry(_build_messages(queries[i], packed.text), profile.llm_model)
+        except Exception as e:
+            # One failed question must not sink the rest of the batch
+            return i, {"answer": "", "error": str(e)}
+        result = {"answer": resp.choices[0].message.content.strip(), **packed.stats()}
+        await answer_cache.astore(profile.collection_name, profile.llm_model, queries[i], vectors[i], result, generation)
+        return i, result
 
-    return {"answer": answer}
+    tasks = [asyncio.create_task(answer(i, docs)) for i, docs in zip(pending, results)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
 
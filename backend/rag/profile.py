@@ -0,0 +1,76 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from models.raginstance_model import QuantizationEnum, RAGInstance
+from rag.cache import LRUCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Fallbacks for RAGs created before a setting existed (or with it left empty)
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+TOP_K = int(os.getenv("TOP_K", "4"))
+MAX_TOP_K = int(os.getenv("MAX_TOP_K", "50"))
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "2000"))  # counted with the chat model's tokenizer
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "1024"))
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "300"))  # seconds
+
+# rag id -> RetrievalProfile
+_profiles = LRUCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class RetrievalProfile:
+    """Everything the query path needs to know about one RAG, resolved once."""
+
+    collection_name: str
+    k: int = TOP_K
+    score_threshold: Optional[float] = None  # min cosine similarity for dense hits; None = no cut-off
+    mmr_lambda: Optional[float] = None  # 1.0 = pure relevance, 0.0 = max diversity; None = MMR off
+    context_token_budget: int = MAX_CONTEXT_TOKENS
+    llm_model: str = CHAT_MODEL
+    embedding_model: str = EMBEDDING_MODEL
+    embedding_dimensions: Optional[int] = None
+    quantization: Optional[str] = None
+    sparse_vectors: bool = False
+
+
+def build_profile(rag: RAGInstance) -> RetrievalProfile:
+    return RetrievalProfile(
+        collection_name=rag.qdrant_collection,
+        k=min(max(1, rag.top_k or TOP_K), MAX_TOP_K),
+        score_threshold=rag.score_threshold,
+        mmr_lambda=rag.mmr_lambda,
+        context_token_budget=rag.context_token_budget or MAX_CONTEXT_TOKENS,
+        llm_model=rag.llm_model or CHAT_MODEL,
+        embedding_model=rag.embedding_model or EMBEDDING_MODEL,
+        embedding_dimensions=rag.embedding_dimensions,
+        quantization=rag.vector_quantization or QuantizationEnum.NONE.value,
+        sparse_vectors=bool(rag.sparse_vectors),
+    )
+
+
+def get_profile(rag: RAGInstance) -> RetrievalProfile:
+    """
+    Cached profile for a RAG. Settings are fixed when the RAG is created, so
+    entries only expire by TTL or when the RAG is deleted.
+    """
+    profile = _profiles.get(rag.id)
+    if profile is None:
+        profile = build_profile(rag)
+        _profiles.set(rag.id, profile)
+        logger.info(
+            f"Retrieval profile for {profile.collection_name}: k={profile.k}, llm={profile.llm_model}, "
+            f"embedding={profile.embedding_model}, budget={profile.context_token_budget}"
+        )
+    return profile
+
+
+def forget_profile(rag_id) -> None:
+    _profiles.pop(rag_id)
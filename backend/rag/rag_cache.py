@@ -0,0 +1,172 @@
+"""Read-through cache of RAG metadata, by id and by collection name.
+
+Entries are RagRecord values: the RAGInstance columns the API reads (owner,
+status, settings, document count), frozen and detached from any session. The
+attribute names match the ORM model, so a record can go anywhere a
+RAGInstance was read from, e.g. get_profile().
+
+Two tiers: a few seconds in-process, then valkey. Writers update valkey in
+place: create/delete and document changes from the API, status transitions
+from the Celery indexing code (sync helpers). Other API processes see a change
+once their local copy expires (RAG_CACHE_LOCAL_TTL).
+
+Per-user listings are not cached: they are paginated and carry live document
+stats, and one indexed query per page is cheaper than keeping lists coherent.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, fields
+from typing import Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.valkey import get_async_valkey, get_valkey
+from models.raginstance_model import RAGInstance
+from rag.cache import LRUCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "4096"))
+RAG_CACHE_LOCAL_TTL = float(os.getenv("RAG_CACHE_LOCAL_TTL", "5"))  # seconds; bounds how stale status polls get
+RAG_CACHE_TTL = int(os.getenv("RAG_CACHE_TTL", "3600"))  # seconds, valkey tier
+
+# ("id", rag_id) / ("col", collection) -> record
+_local = LRUCache(maxsize=RAG_CACHE_SIZE, ttl=RAG_CACHE_LOCAL_TTL)
+
+
+@dataclass(frozen=True)
+class RagRecord:
+    id: UUID
+    user_id: UUID
+    name: str
+    description: Optional[str]
+    qdrant_collection: str
+    status: Optional[str]
+    document_count: Optional[int]
+    is_active: Optional[bool]
+    embedding_model: Optional[str]
+    embedding_dimensions: Optional[int]
+    llm_model: Optional[str]
+    chunk_size: Optional[int]
+    chunk_overlap: Optional[int]
+    top_k: Optional[int]
+    score_threshold: Optional[float]
+    mmr_lambda: Optional[float]
+    context_token_budget: Optional[int]
+    vector_quantization: Optional[str]
+    vectors_on_disk: Optional[bool]
+    hnsw_m: Optional[int]
+    hnsw_ef_construct: Optional[int]
+    sparse_vectors: Optional[bool]
+
+    @classmethod
+    def from_orm(cls, rag: RAGInstance) -> "RagRecord":
+        return cls(**{f.name: getattr(rag, f.name) for f in fields(cls)})
+
+    def to_json(self) -> str:
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["id"], data["user_id"] = str(self.id), str(self.user_id)
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "RagRecord":
+        data = json.loads(raw)
+        data["id"], data["user_id"] = UUID(data["id"]), UUID(data["user_id"])
+        return cls(**data)
+
+
+def _id_key(rag_id) -> str:
+    return f"rag:meta:id:{rag_id}"
+
+
+def _collection_key(collection_name: str) -> str:
+    return f"rag:meta:col:{collection_name}"
+
+
+def _remember(record: RagRecord) -> None:
+    _local.set(("id", str(record.id)), record)
+    _local.set(("col", record.qdrant_collection), record)
+
+
+def _pipeline_store(pipe, record: RagRecord) -> None:
+    pipe.set(_id_key(record.id), record.to_json(), ex=RAG_CACHE_TTL)
+    pipe.set(_collection_key(record.qdrant_collection), str(record.id), ex=RAG_CACHE_TTL)
+
+
+# ---- API side (async)
+
+async def aget_by_id(db: AsyncSession, rag_id) -> Optional[RagRecord]:
+    record = _local.get(("id", str(rag_id)))
+    if record is not None:
+        return record
+    try:
+        raw = await get_async_valkey().get(_id_key(rag_id))
+        if raw is not None:
+            record = RagRecord.from_json(raw)
+            _remember(record)
+            return record
+    except Exception as e:
+        logger.warning(f"RAG cache read failed: {e}")
+    rag = await db.scalar(select(RAGInstance).where(RAGInstance.id == rag_id))
+    return await astore(rag) if rag else None
+
+
+async def aget_by_collection(db: AsyncSession, collection_name: str) -> Optional[RagRecord]:
+    record = _local.get(("col", collection_name))
+    if record is not None:
+        return record
+    try:
+        rag_id = await get_async_valkey().get(_collection_key(collection_name))
+        if rag_id is not None:
+            raw = await get_async_valkey().get(_id_key(rag_id.decode()))
+            if raw is not None:
+                record = RagRecord.from_json(raw)
+                _remember(record)
+                return record
+    except Exception as e:
+        logger.warning(f"RAG cache read failed: {e}")
+    rag = await db.scalar(select(RAGInstance).where(RAGInstance.qdrant_collection == collection_name))
+    return await astore(rag) if rag else None
+
+
+async def astore(rag: RAGInstance) -> RagRecord:
+    """Write the current row through to the cache."""
+    record = RagRecord.from_orm(rag)
+    _remember(record)
+    try:
+        pipe = get_async_valkey().pipeline(transaction=False)
+        _pipeline_store(pipe, record)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"RAG cache write failed: {e}")
+    return record
+
+
+async def aforget(rag_id, collection_name: str) -> None:
+    _local.pop(("id", str(rag_id)))
+    _local.pop(("col", collection_name))
+    try:
+        await get_async_valkey().delete(_id_key(rag_id), _collection_key(collection_name))
+    except Exception as e:
+        logger.warning(f"RAG cache invalidation failed: {e}")
+
+
+# ---- Celery side (sync)
+
+def store(rag: RAGInstance) -> None:
+    """Publish a status/count change made by the indexing code."""
+    record = RagRecord.from_orm(rag)
+    _remember(record)
+    try:
+        pipe = get_valkey().pipeline(transaction=False)
+        _pipeline_store(pipe, record)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"RAG cache write failed: {e}")
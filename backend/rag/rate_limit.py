@@ -0,0 +1,302 @@
+"""Cluster-wide rate limiting for indexing embedding calls.
+
+Every worker takes from the same token bucket in valkey before it calls the
+embeddings API: one bucket for tokens per minute, one for requests per
+minute, refilled continuously and checked atomically by a Lua script (the
+clock is valkey's, so workers on different hosts agree). A worker that has
+to wait sleeps for the time the script says the budget needs to refill.
+
+A 429 still gets through now and then (other clients of the same key, a
+limit set too high). It empties the shared bucket, so every worker backs
+off, and the batch is retried with exponential backoff. The request size
+adapts: it halves after a 429 and grows back after a run of clean calls.
+Queue depth, throttle time and 429 counts are kept in valkey for stats().
+
+If valkey is unreachable, calls go out unthrottled and only the 429
+backoff protects them.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import openai
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from db.valkey import get_valkey
+from rag.context import count_tokens
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Set these to the organisation's limits for the embedding model
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))
+EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "3000"))
+EMBEDDING_RATE_LIMIT_ENABLED = os.getenv("EMBEDDING_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Upper bounds for one embeddings request (the API allows 2048 inputs / 300k tokens)
+EMBEDDING_MAX_REQUEST_TOKENS = int(os.getenv("EMBEDDING_MAX_REQUEST_TOKENS", "100000"))
+EMBEDDING_MAX_BATCH_INPUTS = int(os.getenv("EMBEDDING_MAX_BATCH_INPUTS", "512"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+EMBEDDING_BACKOFF_BASE = float(os.getenv("EMBEDDING_BACKOFF_BASE", "1.0"))  # seconds
+EMBEDDING_BACKOFF_MAX = float(os.getenv("EMBEDDING_BACKOFF_MAX", "60.0"))  # seconds
+GROW_AFTER = 10  # clean requests before the request size grows again
+
+_KEY = "rag:ratelimit:embeddings"
+_last_warning = 0.0
+_RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+# Returns 0 and takes the budget, or the milliseconds until it will be there
+_TAKE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tpm, rpm = tonumber(ARGV[1]), tonumber(ARGV[2])
+local want = math.min(tonumber(ARGV[3]), tpm)
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'requests', 'ts')
+local tokens = tonumber(b[1]) or tpm
+local reqs = tonumber(b[2]) or rpm
+local elapsed = math.max(0, now - (tonumber(b[3]) or now))
+tokens = math.min(tpm, tokens + elapsed * tpm / 60000)
+reqs = math.min(rpm, reqs + elapsed * rpm / 60000)
+local wait = 0
+if tokens < want then wait = (want - tokens) * 60000 / tpm end
+if reqs < 1 then wait = math.max(wait, (1 - reqs) * 60000 / rpm) end
+if wait == 0 then
+    tokens = tokens - want
+    reqs = reqs - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'requests', tostring(reqs), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+# After a 429: nobody gets budget until it has refilled from empty
+_DRAIN = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('HSET', KEYS[1], 'tokens', '0', 'requests', '0', 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return 1
+"""
+
+
+def _warn(message: str) -> None:
+    """At most one warning a minute: a valkey outage would otherwise log on every request."""
+    global _last_warning
+    if time.monotonic() - _last_warning >= 60:
+        _last_warning = time.monotonic()
+        logger.warning(message)
+
+
+class RateLimiter:
+    """Client for one model's shared bucket (OpenAI limits are per model)."""
+
+    def __init__(self, model: str, tpm: int = EMBEDDING_TPM, rpm: int = EMBEDDING_RPM):
+        self.model = model
+        self.tpm = max(1, tpm)
+        self.rpm = max(1, rpm)
+        self.bucket_key = f"{_KEY}:{model}:bucket"
+        self.stats_key = f"{_KEY}:{model}:stats"
+        self.waiting_key = f"{_KEY}:{model}:waiting"
+        self._take = None
+        self._drain = None
+
+    def _scripts(self):
+        if self._take is None:
+            client = get_valkey()
+            self._take = client.register_script(_TAKE)
+            self._drain = client.register_script(_DRAIN)
+        return self._take, self._drain
+
+    def acquire(self, tokens: int) -> float:
+        """Block until `tokens` tokens and one request are available. Returns the seconds spent waiting."""
+        if not EMBEDDING_RATE_LIMIT_ENABLED:
+            return 0.0
+        waited, queued = 0.0, False
+        try:
+            take, _ = self._scripts()
+            while True:
+                wait_ms = int(take(keys=[self.bucket_key], args=[self.tpm, self.rpm, tokens]))
+                if wait_ms <= 0:
+                    break
+                if not queued:
+                    get_valkey().incr(self.waiting_key)
+                    queued = True
+                # A little jitter so woken workers don't all retry in the same millisecond
+                delay = wait_ms / 1000 * (1 + random.random() * 0.1)
+                time.sleep(delay)
+                waited += delay
+            self._record(requests=1, tokens=tokens, throttled_ms=int(waited * 1000))
+        except Exception as e:
+            _warn(f"Embedding rate limiter unavailable, sending unthrottled: {e}")
+        finally:
+            if queued:
+                try:
+                    get_valkey().decr(self.waiting_key)
+                except Exception:
+                    pass
+        return waited
+
+    def rate_limited(self) -> None:
+        """Report a 429: empty the bucket so every worker backs off, not just this one."""
+        try:
+            _, drain = self._scripts()
+            drain(keys=[self.bucket_key])
+            self._record(rate_limited=1)
+        except Exception as e:
+            _warn(f"Could not report 429 to the embedding rate limiter: {e}")
+
+    def _record(self, **counters: int) -> None:
+        pipe = get_valkey().pipeline(transaction=False)
+        for name, amount in counters.items():
+            if amount:
+                pipe.hincrby(self.stats_key, name, amount)
+        pipe.execute()
+
+    def stats(self) -> Dict:
+        client = get_valkey()
+        counters = {k.decode(): int(v) for k, v in client.hgetall(self.stats_key).items()}
+        bucket = {k.decode(): float(v) for k, v in client.hgetall(self.bucket_key).items()}
+        return {
+            "model": self.model,
+            "tpm": self.tpm,
+            "rpm": self.rpm,
+            "queue_depth": max(0, int(client.get(self.waiting_key) or 0)),
+            "requests": counters.get("requests", 0),
+            "tokens": counters.get("tokens", 0),
+            "throttled_seconds": round(counters.get("throttled_ms", 0) / 1000, 1),
+            "rate_limited": counters.get("rate_limited", 0),
+            "tokens_available": int(bucket["tokens"]) if "tokens" in bucket else self.tpm,
+            "requests_available": int(bucket["requests"]) if "requests" in bucket else self.rpm,
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = RateLimiter(model)
+        return _limiters[model]
+
+
+def stats() -> List[Dict]:
+    """Cluster-wide counters for every model that has a bucket in valkey."""
+    client = get_valkey()
+    models = {
+        key.decode()[len(_KEY) + 1:-len(":stats")]
+        for key in client.scan_iter(match=f"{_KEY}:*:stats", count=100)
+    }
+    return [get_rate_limiter(model).stats() for model in sorted(models)]
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """
+    Wraps the indexing embeddings client (built with max_retries=0, so 429s
+    reach us instead of being retried blindly). Texts are grouped into
+    requests of at most `request_tokens` tokens, each paid for from the
+    shared bucket before it is sent.
+    """
+
+    def __init__(self, inner: Embeddings, model: str):
+        self.inner = inner
+        self.model = model
+        self.limiter = get_rate_limiter(model)
+        self.max_request_tokens = max(1, min(EMBEDDING_MAX_REQUEST_TOKENS, EMBEDDING_TPM))
+        self.request_tokens = self.max_request_tokens
+        self.tokens = 0  # sent to the API
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+        self._clean = 0
+        self._avg_tokens: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def batch_size(self, default: int) -> int:
+        """How many chunks fill one request at the current size; ingestion sizes its batches by this."""
+        with self._lock:
+            if self._avg_tokens is None:
+                return default
+            return max(1, min(EMBEDDING_MAX_BATCH_INPUTS, int(self.request_tokens / self._avg_tokens)))
+
+    def _groups(self, counts: List[int]) -> List[List[int]]:
+        groups, current, size = [], [], 0
+        limit = self.request_tokens
+        for i, n in enumerate(counts):
+            if current and (size + n > limit or len(current) >= EMBEDDING_MAX_BATCH_INPUTS):
+                groups.append(current)
+                current, size = [], 0
+            current.append(i)
+            size += n
+        if current:
+            groups.append(current)
+        return groups
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._clean += 1
+            if self._clean >= GROW_AFTER and self.request_tokens < self.max_request_tokens:
+                self.request_tokens = min(self.max_request_tokens, int(self.request_tokens * 1.25) + 1)
+                self._clean = 0
+
+    def _on_rate_limited(self) -> None:
+        with self._lock:
+            self.rate_limited += 1
+            self._clean = 0
+            self.request_tokens = max(1, self.request_tokens // 2)
+        self.limiter.rate_limited()
+
+    def _send(self, texts: List[str], tokens: int) -> List[List[float]]:
+        for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+            waited = self.limiter.acquire(tokens)
+            with self._lock:
+                self.throttled_seconds += waited
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except _RETRYABLE as e:
+                if attempt == EMBEDDING_MAX_RETRIES:
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    self._on_rate_limited()
+                delay = _retry_after(e) or random.uniform(0, min(EMBEDDING_BACKOFF_MAX, EMBEDDING_BACKOFF_BASE * 2 ** attempt))
+                logger.warning(f"Embedding request of {len(texts)} texts failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                with self._lock:
+                    self.throttled_seconds += delay
+                continue
+            self._on_success()
+            with self._lock:
+                self.tokens += tokens
+            return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        counts = [max(1, count_tokens(t, self.model)) for t in texts]
+        with self._lock:
+            avg = sum(counts) / len(counts)
+            self._avg_tokens = avg if self._avg_tokens is None else 0.8 * self._avg_tokens + 0.2 * avg
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for group in self._groups(counts):
+            result = self._send([texts[i] for i in group], sum(counts[i] for i in group))
+            for i, vector in zip(group, result):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        self.limiter.acquire(max(1, count_tokens(text, self.model)))
+        return self.inner.embed_query(text)
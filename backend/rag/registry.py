@@ -0,0 +1,56 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from rag.cache import LRUCache, bump_collection_generation
+from rag.embeddings import CachedQueryEmbeddings
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")  # optional
+EMBEDDING_CLIENT_CACHE_SIZE = int(os.getenv("EMBEDDING_CLIENT_CACHE_SIZE", "8"))
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+_embeddings = LRUCache(maxsize=EMBEDDING_CLIENT_CACHE_SIZE)
+
+
+def get_qdrant_client() -> QdrantClient:
+    """One QdrantClient (and its connection pool) per process."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    return _client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Async client for the event-loop query path; created lazily inside the running loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncQdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    return _async_client
+
+
+def get_embeddings(model: str, dimensions: Optional[int] = None) -> CachedQueryEmbeddings:
+    key = (model, dimensions)
+    emb = _embeddings.get(key)
+    if emb is None:
+        emb = CachedQueryEmbeddings(model, dimensions)
+        _embeddings.set(key, emb)
+    return emb
+
+
+def invalidate_collection(collection_name: str) -> None:
+    """Tell every process that anything cached for this collection is stale."""
+    bump_collection_generation(collection_name)
+    logger.info(f"Invalidated cached views of {collection_name}")
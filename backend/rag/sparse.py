@@ -0,0 +1,68 @@
+"""Local BM25-style sparse vectors for lexical retrieval.
+
+Documents carry the BM25 term-frequency part; Qdrant applies IDF at query time
+(the sparse vector is configured with Modifier.IDF), so nothing here depends on
+corpus statistics and a chunk's vector never changes when other chunks are added.
+Terms are hashed to 32-bit indices, so there is no vocabulary to store or sync.
+"""
+
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from langchain_qdrant import SparseVector
+
+load_dotenv()
+
+SPARSE_VECTOR_NAME = "bm25"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+BM25_AVG_DOC_TOKENS = float(os.getenv("BM25_AVG_DOC_TOKENS", "256"))  # ~1500-char chunks
+
+# Identifiers such as ERR_CONN_42, 0x80070005, v2.3.1 or /api/v1/ask stay whole tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-:/][a-z0-9]+)*")
+_PART_RE = re.compile(r"[._\-:/]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its of on or "
+    "that the their there these this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound identifiers are kept whole and also split into their parts."""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        parts = _PART_RE.split(token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p and p not in _STOPWORDS)
+    return terms
+
+
+def _index(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _hashed(weights: Dict[str, float]) -> SparseVector:
+    merged: Dict[int, float] = {}
+    for term, weight in weights.items():
+        idx = _index(term)
+        merged[idx] = merged.get(idx, 0.0) + weight  # hash collisions must not repeat an index
+    return SparseVector(indices=list(merged), values=list(merged.values()))
+
+
+def encode_document(text: str) -> SparseVector:
+    terms = tokenize(text)
+    if not terms:
+        return SparseVector(indices=[], values=[])
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / BM25_AVG_DOC_TOKENS)
+    return _hashed({t: tf * (BM25_K1 + 1) / (tf + norm) for t, tf in Counter(terms).items()})
+
+
+def encode_query(text: str) -> SparseVector:
+    return _hashed({t: 1.0 for t in set(tokenize(text))})
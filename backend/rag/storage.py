@@ -0,0 +1,78 @@
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    HnswConfigDiff,
+    Modifier,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from models.raginstance_model import QuantizationEnum
+from rag.sparse import SPARSE_VECTOR_NAME
+
+load_dotenv()
+
+# How many extra candidates to pull from the quantized index before rescoring
+# them against the original vectors. Binary codes are much coarser than int8.
+SCALAR_OVERSAMPLING = float(os.getenv("SCALAR_OVERSAMPLING", "1.5"))
+BINARY_OVERSAMPLING = float(os.getenv("BINARY_OVERSAMPLING", "3.0"))
+
+EMBEDDING_SIZES = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def collection_config(rag, vector_size: int) -> Dict:
+    """create_collection kwargs for a RAGInstance's vector storage profile."""
+    quantization = rag.vector_quantization or QuantizationEnum.NONE.value
+    quantization_config = None
+    if quantization == QuantizationEnum.SCALAR.value:
+        quantization_config = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif quantization == QuantizationEnum.BINARY.value:
+        quantization_config = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+
+    return {
+        "vectors_config": VectorParams(
+            size=vector_size,
+            distance=Distance.COSINE,
+            # Originals only need to be read when rescoring the oversampled candidates
+            on_disk=bool(rag.vectors_on_disk),
+        ),
+        # m=0 is valid: Qdrant then builds no HNSW graph and searches by full scan
+        "hnsw_config": HnswConfigDiff(
+            m=16 if rag.hnsw_m is None else rag.hnsw_m,
+            ef_construct=100 if rag.hnsw_ef_construct is None else rag.hnsw_ef_construct,
+        ),
+        "quantization_config": quantization_config,
+        # Lexical vectors live next to the dense one; Qdrant applies IDF at query time
+        "sparse_vectors_config": (
+            {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)} if rag.sparse_vectors else None
+        ),
+    }
+
+
+def search_params(quantization: Optional[str]) -> Optional[SearchParams]:
+    """Search through the quantized index with oversampling, then rescore with full vectors."""
+    if quantization == QuantizationEnum.SCALAR.value:
+        oversampling = SCALAR_OVERSAMPLING
+    elif quantization == QuantizationEnum.BINARY.value:
+        oversampling = BINARY_OVERSAMPLING
+    else:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(ignore=False, rescore=True, oversampling=oversampling)
+    )
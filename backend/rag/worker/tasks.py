@@ -1,19 +1,155 @@
+import logging
+import os
+import time
+from datetime import datetime
+
+from celery import chord
+from celery.result import AsyncResult
+
 from rag.worker.celery_app import celery_app
-from rag.indexing import rag_indexing
+from rag.indexing import prepare_rag_indexing, index_document, finalize_rag_indexing, mark_rag_failed
+from models.raginstance_model import StatusEnum
 from db.supabase import SessionLocal
 
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = float(os.getenv("INDEXING_PROGRESS_INTERVAL", "2.0"))  # seconds between state updates
+PROGRESS = "PROGRESS"
+
+
+def document_task_id(document_id, parent_task_id) -> str:
+    return f"index-doc-{document_id}-{parent_task_id}"
+
+
 @celery_app.task(bind=True)
-def rag_indexing_task(self, rag_id, qdrant_collection, user_id):
+def rag_indexing_task(self, rag_id, qdrant_collection, document_ids=None):
+    """
+    Fan out one index_document_task per document (all pending documents of the
+    RAG unless `document_ids` is given). finalize_rag_indexing_task runs once
+    all of them have finished.
+    """
+    self.update_state(state=PROGRESS, meta={"stage": "preparing", "rag_id": str(rag_id)})
     db = SessionLocal()
     try:
-        rag_indexing(
+        document_ids = prepare_rag_indexing(
             rag_id=rag_id,
             db=db,
             qdrant_collection=qdrant_collection,
-            id=user_id
+            document_ids=document_ids,
+            task_id=self.request.id,
         )
     except Exception as e:
-        # Optional: log error here
+        mark_rag_failed(rag_id, db)
         raise e
     finally:
         db.close()
+
+    if not document_ids:
+        return finalize_rag_indexing_task.delay([], str(rag_id), qdrant_collection, []).id
+
+    header = [
+        index_document_task.s(str(document_id)).set(task_id=document_task_id(document_id, self.request.id))
+        for document_id in document_ids
+    ]
+    run_ids = [str(d) for d in document_ids]
+    result = chord(header)(finalize_rag_indexing_task.s(str(rag_id), qdrant_collection, run_ids))
+    logger.info(f"Queued {len(header)} document task(s) for {qdrant_collection}")
+    # Live per-stage numbers are on each document task's state; indexing_progress() collects them
+    self.update_state(state=PROGRESS, meta={
+        "stage": "indexing",
+        "rag_id": str(rag_id),
+        "documents": run_ids,
+        "finalize_task_id": result.id,
+    })
+    return result.id
+
+
+@celery_app.task(bind=True)
+def index_document_task(self, document_id):
+    # Never raises: a failed chord member would skip the finalizer for the whole RAG
+    last = [0.0]
+
+    def report(metrics):
+        if time.monotonic() - last[0] >= PROGRESS_INTERVAL:
+            last[0] = time.monotonic()
+            self.update_state(state=PROGRESS, meta={"document_id": document_id, **metrics.as_dict()})
+
+    db = SessionLocal()
+    try:
+        return index_document(document_id, db, on_progress=report)
+    except Exception as e:
+        logger.error(f"Document task {document_id} failed: {e}", exc_info=True)
+        return {"document_id": document_id, "status": "failed"}
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True)
+def finalize_rag_indexing_task(self, results, rag_id, qdrant_collection, document_ids=None):
+    db = SessionLocal()
+    try:
+        return finalize_rag_indexing(rag_id, db, qdrant_collection, document_ids)
+    except Exception as e:
+        mark_rag_failed(rag_id, db)
+        raise e
+    finally:
+        db.close()
+
+
+def indexing_progress(rag, documents) -> dict:
+    """
+    Progress of the RAG's current (or last) indexing run. Finished documents are
+    read from their rows, running ones from their task state; the ETA assumes
+    the bytes still to go are processed at the rate seen so far.
+    """
+    run = rag.indexing_metrics or {}
+    task_id = run.get("task_id")
+    in_run = set(run.get("documents") or [])
+    items, total_bytes, done_bytes = [], 0, 0.0
+    for document in documents:
+        if in_run and str(document.id) not in in_run:
+            continue
+        metrics = document.indexing_metrics
+        fraction = 0.0
+        if document.status in (StatusEnum.READY.value, StatusEnum.FAILED.value):
+            fraction = 1.0
+        elif document.status == StatusEnum.PROCESSING.value and task_id:
+            state = AsyncResult(document_task_id(document.id, task_id), app=celery_app)
+            if state.state == PROGRESS and isinstance(state.info, dict):
+                metrics = state.info
+                fraction = metrics.get("fraction") or 0.0
+        size = document.file_size or 0
+        total_bytes += size
+        done_bytes += size * fraction
+        items.append({
+            "document_id": str(document.id),
+            "filename": document.filename,
+            "status": document.status,
+            "fraction": round(fraction, 4),
+            "metrics": metrics,
+        })
+
+    elapsed, eta = None, None
+    if run.get("started_at"):
+        end = datetime.fromisoformat(run["finished_at"]) if run.get("finished_at") else datetime.utcnow()
+        elapsed = (end - datetime.fromisoformat(run["started_at"])).total_seconds()
+        if rag.status == StatusEnum.PROCESSING.value and done_bytes and elapsed:
+            eta = (total_bytes - done_bytes) / (done_bytes / elapsed)
+    counts = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return {
+        "rag_id": str(rag.id),
+        "status": rag.status,
+        "task_id": task_id,
+        "started_at": run.get("started_at"),
+        "finished_at": run.get("finished_at"),
+        "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "percent": round(100 * done_bytes / total_bytes, 1) if total_bytes else 0.0,
+        "bytes_total": total_bytes,
+        "bytes_done": int(done_bytes),
+        "documents": counts,
+        "totals": run.get("totals"),
+        "items": items,
+    }
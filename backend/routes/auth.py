@@ -1,18 +1,22 @@
 import os
-from fastapi import APIRouter,Depends,HTTPException,status,Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter,Depends,HTTPException,status,Response,Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime,timedelta
 from dotenv import load_dotenv
 from db.supabase import get_db
 from models.user_model import User
 from schemas.user_schema import UserCreate,UserLogin,UserResponse
 from schemas.token import Token
-from core.deps import get_current_user
+from core.deps import get_current_user, COOKIE_NAME
+from core import user_cache
+from core.user_cache import CurrentUser
 
 from core.security import (
-    verify_password,
-    get_password_hash,
-    create_access_token
+    averify_and_update,
+    aget_password_hash,
+    create_access_token,
+    decode_access_token,
 )
 
 load_dotenv()
@@ -22,8 +26,8 @@ ACCESS_TOKEN_EXPIRY_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRY_MINUTES")
 router =APIRouter()
 
 @router.post("/signup",response_model=UserResponse,status_code=status.HTTP_201_CREATED)
-async def signup(user_data:UserCreate,db:Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+async def signup(user_data:UserCreate,db:AsyncSession = Depends(get_db)):
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     
     if existing_user:
         raise HTTPException(
@@ -31,7 +35,7 @@ async def signup(user_data:UserCreate,db:Session = Depends(get_db)):
             detail="Email already exits"
         )
     
-    hashed_password= get_password_hash(user_data.password)
+    hashed_password= await aget_password_hash(user_data.password)
     new_user = User(
         full_name = user_data.full_name,
         email = user_data.email,
@@ -39,8 +43,8 @@ async def signup(user_data:UserCreate,db:Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
@@ -49,17 +53,22 @@ async def signup(user_data:UserCreate,db:Session = Depends(get_db)):
 async def login(
     credentials: UserLogin,
     response: Response,                     
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
    
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
 
    
-    if not user or not verify_password(credentials.password, user.password):
+    verified, new_hash = await averify_and_update(credentials.password, user.password) if user else (False, None)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect user or password",
         )
+    if new_hash:
+        # bcrypt or outdated argon2 settings: store the upgraded hash
+        user.password = new_hash
+        await db.commit()
 
     
     access_token_expires = timedelta(minutes=1440)
@@ -69,6 +78,8 @@ async def login(
         data={"sub": str(user.id)},
         expires_delta=access_token_expires,
     )
+    # The next authenticated request finds the user without a query
+    await user_cache.put(str(user.id), CurrentUser.from_orm(user))
 
     
     # SameSite=None; Secure required so browser stores cookie when frontend (e.g. :3000) and backend (:8000) are different origins
@@ -86,13 +97,16 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     
     return current_user    
 
 @router.get("/logout", status_code=status.HTTP_200_OK)
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
+    payload = decode_access_token(request.cookies.get(COOKIE_NAME) or "")
+    if payload and payload.get("sub"):
+        await user_cache.invalidate(payload["sub"])
     response.delete_cookie(
         key="session",
         path="/",
@@ -1,37 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-import asyncio
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.supabase import get_db
-from rag.pipeline import process_query, process_query_stream
-from models.user_model import User
-from schemas.user_schema import AskRequest, AskResponse
+from rag.pipeline import ASK_BATCH_CONCURRENCY, aprocess_query, aprocess_query_stream, aprocess_query_batch, resolve_retrieval_mode
+from rag import embeddings as embedding_cache
+from rag import chunk_cache
+from rag import rate_limit
+from rag.profile import get_profile
+from rag import rag_cache
+from schemas.user_schema import AskRequest, AskResponse, AskBatchRequest, AskBatchResponse, AskBatchItem
 from core.deps import get_current_user
-from models.raginstance_model import RAGInstance
+from core.user_cache import CurrentUser
+from models.raginstance_model import RAGInstance, RetrievalModeEnum
 from uuid import UUID
+import os
+import asyncio
+
+ASK_BATCH_MAX_QUERIES = int(os.getenv("ASK_BATCH_MAX_QUERIES", "500"))
+ASK_BATCH_MAX_CONCURRENCY = int(os.getenv("ASK_BATCH_MAX_CONCURRENCY", "32"))
 
 router = APIRouter()
 
 
+def _check_mode(mode):
+    if mode is not None and mode not in {m.value for m in RetrievalModeEnum}:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Allowed: {[m.value for m in RetrievalModeEnum]}")
+
+
 @router.post("/ask", response_model=AskResponse, summary="Send user query to LLM and vector store")
-async def ask_rag(body: AskRequest , db:Session=Depends(get_db),
-    user:User = Depends(get_current_user)):
+async def ask_rag(body: AskRequest , db:AsyncSession=Depends(get_db),
+    user:CurrentUser = Depends(get_current_user)):
     query = body.query.strip()
     collection_name = body.collection_name
-    embedding = body.embedding
     if not query:
         raise HTTPException(status_code=400, detail="User query is required")
-    rag = db.query(RAGInstance).filter(RAGInstance.qdrant_collection == collection_name).first()
+    _check_mode(body.mode)
+    rag = await rag_cache.aget_by_collection(db, collection_name)
     if not rag:
         raise HTTPException(status_code=404, detail="RAG not found")
     if rag.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed to query this RAG")
     
+    profile = get_profile(rag)
+    mode = resolve_retrieval_mode(body.mode, query, profile.sparse_vectors)
     try:
-        result = await asyncio.to_thread(process_query, query, collection_name, embedding)
-        print(result)
-        return result
+        return await aprocess_query(query, profile, mode)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG error: {e}")
 
@@ -39,29 +53,85 @@ async def ask_rag(body: AskRequest , db:Session=Depends(get_db),
 @router.post("/ask/stream", summary="Stream LLM response token-by-token")
 async def ask_rag_stream(
     body: AskRequest,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
     query = body.query.strip()
     collection_name = body.collection_name
-    embedding = body.embedding
     if not query:
         raise HTTPException(status_code=400, detail="User query is required")
-    rag = db.query(RAGInstance).filter(RAGInstance.qdrant_collection == collection_name).first()
+    _check_mode(body.mode)
+    rag = await rag_cache.aget_by_collection(db, collection_name)
     if not rag:
         raise HTTPException(status_code=404, detail="RAG not found")
     if rag.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed to query this RAG")
 
-    def generate():
-        for text in process_query_stream(query, collection_name, embedding):
+    profile = get_profile(rag)
+    mode = resolve_retrieval_mode(body.mode, query, profile.sparse_vectors)
+
+    async def generate():
+        async for text in aprocess_query_stream(query, profile, mode):
             if text:
                 yield text.encode("utf-8")
 
     return StreamingResponse(
         generate(),
         media_type="text/plain; charset=utf-8",
-    ) 
- 
- 
- 
\ No newline at end of file
+    )
+
+
+@router.post("/ask/batch", response_model=AskBatchResponse, summary="Answer many queries against one RAG")
+async def ask_rag_batch(
+    body: AskBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    queries = [q.strip() for q in body.queries]
+    collection_name = body.collection_name
+    if any(not q for q in queries):
+        raise HTTPException(status_code=400, detail="Every query must be non-empty")
+    if len(queries) > ASK_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {ASK_BATCH_MAX_QUERIES} queries per batch")
+    _check_mode(body.mode)
+    rag = await rag_cache.aget_by_collection(db, collection_name)
+    if not rag:
+        raise HTTPException(status_code=404, detail="RAG not found")
+    if rag.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to query this RAG")
+
+    concurrency = min(body.concurrency or ASK_BATCH_CONCURRENCY, ASK_BATCH_MAX_CONCURRENCY)
+    profile = get_profile(rag)
+    modes = [resolve_retrieval_mode(body.mode, q, profile.sparse_vectors) for q in queries]
+    answers = aprocess_query_batch(queries, profile, concurrency, modes)
+
+    if body.stream:
+        async def generate():
+            async for index, result in answers:
+                item = AskBatchItem(index=index, **result)
+                yield (item.model_dump_json() + "\n").encode("utf-8")
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    try:
+        items = [AskBatchItem(index=index, **result) async for index, result in answers]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RAG error: {e}")
+    return {"answers": sorted(items, key=lambda item: item.index)}
+
+
+@router.get("/cache/stats", summary="Hit/miss counters for the embedding caches")
+async def cache_stats(user: CurrentUser = Depends(get_current_user)):
+    try:
+        chunk_embeddings = await asyncio.to_thread(chunk_cache.stats)  # SQLite + file I/O, shared by all indexing workers
+    except Exception as e:
+        chunk_embeddings = {"error": str(e)}
+    return {"query_embeddings": embedding_cache.stats.snapshot(), "chunk_embeddings": chunk_embeddings}
+
+
+@router.get("/indexing/rate-limit", summary="Embedding rate limiter: queue depth, throttle time, 429s")
+async def rate_limit_stats(user: CurrentUser = Depends(get_current_user)):
+    try:
+        return {"embeddings": await asyncio.to_thread(rate_limit.stats)}  # shared by all indexing workers
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Rate limiter state unavailable: {e}")
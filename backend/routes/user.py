@@ -1,21 +1,102 @@
 import os
-from fastapi import APIRouter,status,Path,Depends,HTTPException,Body,UploadFile,Form,File
+from fastapi import APIRouter,status,Path,Query,Depends,HTTPException,Body,UploadFile,Form,File
 from schemas.rag import RagCreate
 from db.supabase import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user_model import User
-from models.raginstance_model import RAGInstance
+from models.raginstance_model import RAGInstance, QuantizationEnum, StatusEnum
 from models.document_model import Document
 from core.deps import get_current_user
+from core.user_cache import CurrentUser
 from qdrant_client import QdrantClient
 from uuid import UUID
-from typing import Optional,List
+from typing import Optional,List,Tuple
 import shutil
-import os
-from rag.indexing import rag_indexing
-from rag.worker.tasks import rag_indexing_task
+import hashlib
+import base64
+import json
+import asyncio
+import uuid
+from rag.indexing import delete_document_points
+from rag.worker.tasks import rag_indexing_task, indexing_progress
+from rag.registry import invalidate_collection
+from rag.storage import EMBEDDING_SIZES
+from rag import answer_cache
+from rag import rag_cache
+from rag.profile import MAX_TOP_K, forget_profile
 router= APIRouter()
 
+ALLOWED_EXTENSIONS = {".pdf",".md",".txt",".docx"}
+MAX_DOCUMENTS_PER_UPLOAD = int(os.getenv("MAX_DOCUMENTS_PER_UPLOAD", "50"))
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "100"))  # per file
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+RAG_PAGE_SIZE = int(os.getenv("RAG_PAGE_SIZE", "50"))  # default page of get-user-rags
+MAX_RAG_PAGE_SIZE = int(os.getenv("MAX_RAG_PAGE_SIZE", "200"))
+
+
+def _check_extensions(documents: List[UploadFile]) -> None:
+    for doc in documents:
+        file_ext = os.path.splitext(doc.filename)[1].lower()
+        if file_ext not in ALLOWED_EXTENSIONS:
+            raise HTTPException(400, detail=f"File {doc.filename} has invalid extension. Allowed: {ALLOWED_EXTENSIONS}")
+
+
+def _check_sizes(documents: List[UploadFile]) -> None:
+    # Reject on the declared size before anything is copied
+    for doc in documents:
+        if doc.size is not None and doc.size > MAX_UPLOAD_BYTES:
+            raise HTTPException(413, detail=f"File {doc.filename} is larger than {MAX_UPLOAD_MB} MB")
+
+
+def _write_chunk(f, digest, chunk: bytes) -> None:
+    digest.update(chunk)  # hashlib releases the GIL on large buffers
+    f.write(chunk)
+
+
+async def _receive_upload(doc: UploadFile, upload_dir: str) -> Tuple[str, str, int]:
+    """
+    Copy an upload to a temporary file in `upload_dir` in UPLOAD_CHUNK_BYTES pieces,
+    hashing as it goes; file I/O runs off the event loop. Returns (tmp_path, sha256, size).
+    Raises 413 as soon as the file passes MAX_UPLOAD_BYTES.
+    """
+    await asyncio.to_thread(os.makedirs, upload_dir, exist_ok=True)
+    tmp_path = os.path.join(upload_dir, f".incoming-{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while chunk := await doc.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(413, detail=f"File {doc.filename} is larger than {MAX_UPLOAD_MB} MB")
+            await asyncio.to_thread(_write_chunk, f, digest, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.remove, tmp_path)
+        raise
+    await asyncio.to_thread(f.close)
+    return tmp_path, digest.hexdigest(), size
+
+
+async def _save_document(db: AsyncSession, rag: RAGInstance, user_id: UUID, filename: str, tmp_path: str, size: int,
+                   content_hash: str, document: Optional[Document] = None) -> Document:
+    """Move a received upload into place and create (or reset) its pending Document row."""
+    file_path = os.path.join(f"uploads/{rag.id}", os.path.basename(filename))
+    await asyncio.to_thread(os.replace, tmp_path, file_path)
+
+    name_no_ext, ext = os.path.splitext(os.path.basename(filename))
+    if document is None:
+        document = Document(rag_id=rag.id, user_id=user_id, filename=name_no_ext, file_path=file_path)
+        db.add(document)
+    document.file_type = ext.lstrip(".").lower()
+    document.file_size = size
+    document.content_hash = content_hash
+    document.status = StatusEnum.PENDING.value
+    document.error_message = None
+    return document
+
 # Rag Creation
 @router.post("/create/{id}", status_code=status.HTTP_201_CREATED)
 async def create_rag(
@@ -24,39 +105,69 @@ async def create_rag(
     description: Optional[str] = Form(None),
     qdrant_collection: str = Form(...),
     embedding_model: str = Form(...),
+    embedding_dimensions: Optional[int] = Form(None),
     llm_model: str = Form(...),
     chunk_size: int = Form(...),
     chunk_overlap: int = Form(...),
     top_k: int = Form(...),
+    score_threshold: Optional[float] = Form(None),
+    mmr_lambda: Optional[float] = Form(None),
+    context_token_budget: Optional[int] = Form(None),
+    vector_quantization: str = Form(QuantizationEnum.SCALAR.value),
+    vectors_on_disk: bool = Form(True),
+    hnsw_m: int = Form(16),
+    hnsw_ef_construct: int = Form(100),
+    sparse_vectors: bool = Form(True),
     document_count: int = Form(0),
     is_active: bool = Form(True),
     # File uploads (1-3 files)
     documents: List[UploadFile] = File(..., min_length=1, max_length=3),
     # Dependencies
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
     
 ):
   
-    user  = db.query(User).filter(User.id == id).first()
+    user  = await db.scalar(select(User).where(User.id == id))
     if not user:
         raise HTTPException(404,detail="User not found")
     
     
 
-    existing_rag = db.query(RAGInstance).filter(RAGInstance.qdrant_collection == qdrant_collection).first()
+    if answer_cache.is_answer_collection(qdrant_collection):
+        raise HTTPException(400, f"Collection names ending in {answer_cache.ANSWER_COLLECTION_SUFFIX} are reserved")
+    existing_rag = await db.scalar(select(RAGInstance).where(RAGInstance.qdrant_collection == qdrant_collection))
     if existing_rag:
         raise HTTPException(400, "Rag with this name already exists")
     
     if chunk_overlap >=chunk_size:
         raise HTTPException(400,"Chunk overlap cannot be greater than chunk size")
+
+    if embedding_dimensions is not None:
+        full_size = EMBEDDING_SIZES.get(embedding_model)
+        if not embedding_model.startswith("text-embedding-3") or not full_size:
+            raise HTTPException(400,"embedding_dimensions is only supported for text-embedding-3 models")
+        if not 1 <= embedding_dimensions <= full_size:
+            raise HTTPException(400,f"embedding_dimensions must be between 1 and {full_size}")
+        if embedding_dimensions == full_size:
+            embedding_dimensions = None
+
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise HTTPException(400,f"top_k must be between 1 and {MAX_TOP_K}")
+    if score_threshold is not None and not -1 <= score_threshold <= 1:
+        raise HTTPException(400,"score_threshold is a cosine similarity and must be between -1 and 1")
+    if mmr_lambda is not None and not 0 <= mmr_lambda <= 1:
+        raise HTTPException(400,"mmr_lambda must be between 0 and 1")
+    if context_token_budget is not None and context_token_budget < 1:
+        raise HTTPException(400,"context_token_budget must be positive")
+
+    if vector_quantization not in {q.value for q in QuantizationEnum}:
+        raise HTTPException(400,f"Invalid vector_quantization. Allowed: {[q.value for q in QuantizationEnum]}")
+    if hnsw_m < 0 or hnsw_ef_construct < 4:
+        raise HTTPException(400,"hnsw_m must be >= 0 and hnsw_ef_construct >= 4")
     
-    allowed_extensions = {".pdf",".md",".txt",".docx"}
-    for doc in documents:
-        file_ext = os.path.splitext(doc.filename)[1].lower()    
-        if file_ext not in allowed_extensions:
-            raise HTTPException(400,         detail=f"File {doc.filename} has invalid extension. Allowed: {allowed_extensions}"
-)
+    _check_extensions(documents)
+    _check_sizes(documents)
     
     new_rag = RAGInstance(
       user_id=id,
@@ -64,10 +175,19 @@ async def create_rag(
         description=description,
         qdrant_collection=qdrant_collection,
         embedding_model=embedding_model,
+        embedding_dimensions=embedding_dimensions,
         llm_model=llm_model,
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         top_k=top_k,
+        score_threshold=score_threshold,
+        mmr_lambda=mmr_lambda,
+        context_token_budget=context_token_budget,
+        vector_quantization=vector_quantization,
+        vectors_on_disk=vectors_on_disk,
+        hnsw_m=hnsw_m,
+        hnsw_ef_construct=hnsw_ef_construct,
+        sparse_vectors=sparse_vectors,
         document_count=len(documents),
         is_active=is_active,
         status="pending",
@@ -75,28 +195,31 @@ async def create_rag(
      
     )
     db.add(new_rag)
-    db.commit()
-    db.refresh(new_rag)
+    await db.commit()
+    await db.refresh(new_rag)
     #upload the document for now locally
     upload_dir = f"uploads/{new_rag.id}"
-    os.makedirs(upload_dir,exist_ok=True)
-    
-    saved_files=[]
-    for doc in documents:
-        file_path = os.path.join(upload_dir, doc.filename)
-        with open(file_path, "wb") as f:
-            content = await doc.read()
-            f.write(content)
-        
-        
-        
-      
-        
-       
-        
-    
-    
-    rag_indexing_task.delay(new_rag.id,qdrant_collection=qdrant_collection,user_id=id)
+    seen_hashes = set()
+    try:
+        for doc in documents:
+            tmp_path, content_hash, size = await _receive_upload(doc, upload_dir)
+            if content_hash in seen_hashes:
+                await asyncio.to_thread(os.remove, tmp_path)  # the same file twice in one upload
+                continue
+            seen_hashes.add(content_hash)
+            await _save_document(db, new_rag, id, doc.filename, tmp_path, size, content_hash)
+    except HTTPException:
+        # A file went over the limit mid-stream: don't leave a half-created RAG behind
+        await db.rollback()
+        await db.delete(new_rag)
+        await db.commit()
+        await asyncio.to_thread(shutil.rmtree, upload_dir, ignore_errors=True)
+        raise
+    new_rag.document_count = len(seen_hashes)
+    await db.commit()
+    await rag_cache.astore(new_rag)
+
+    rag_indexing_task.delay(new_rag.id,qdrant_collection=qdrant_collection)
 
     return {
         "id": new_rag.id,
@@ -106,35 +229,90 @@ async def create_rag(
     }
         
 
+def _encode_cursor(name: str, rag_id) -> str:
+    raw = json.dumps([name, str(rag_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, UUID]:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if isinstance(value, list) and len(value) == 2 and all(isinstance(v, str) for v in value):
+            return value[0], UUID(value[1])
+    except ValueError:
+        pass
+    raise HTTPException(400, detail="Invalid cursor")
+
+
+# Per-RAG document stats, aggregated in the listing query. LATERAL keeps the aggregate to
+# the rows of the page (an index lookup on documents.rag_id each), not the whole table
+_document_stats = (
+    select(
+        func.count(Document.id).label("documents"),
+        func.count(Document.id).filter(Document.status == StatusEnum.READY.value).label("indexed_documents"),
+        func.coalesce(func.sum(Document.total_chunks), 0).label("total_chunks"),
+    )
+    .where(Document.rag_id == RAGInstance.id)
+    .lateral("document_stats")
+)
+
+
 @router.get("/get-user-rags/{id}",status_code=status.HTTP_200_OK) 
 async def get_user_rags(
     id:UUID = Path(...,title="User id" ,description="User id"),
-    db:Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    limit:int = Query(RAG_PAGE_SIZE, ge=1, le=MAX_RAG_PAGE_SIZE),
+    cursor:Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db:AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user)
     ):
-    try:
-        user = db.query(User).filter(User.id == id).first()
-    
-        if not user:
-            raise HTTPException(404,detail="User not found")
-        
-        rags = db.query(RAGInstance).filter(RAGInstance.user_id == id).all()
-        
-        return rags
-        
-    except Exception as e:
-      print(f"Error occured while fetching the rags {e}")
-      return
- 
+    """
+    One page of the user's RAGs, ordered by (name, id), with only the list-view
+    columns and document stats. Pass `next_cursor` back as `cursor` for the next
+    page; it is None on the last one.
+    """
+    if id != user.id:
+        raise HTTPException(403, detail="Not allowed to list another user's RAGs")
+    after = _decode_cursor(cursor) if cursor else None
+    query = (
+        select(
+            RAGInstance.id,
+            RAGInstance.user_id,
+            RAGInstance.name,
+            RAGInstance.description,
+            RAGInstance.qdrant_collection,
+            RAGInstance.status,
+            RAGInstance.is_active,
+            RAGInstance.embedding_model,
+            RAGInstance.llm_model,
+            RAGInstance.chunk_size,
+            RAGInstance.chunk_overlap,
+            RAGInstance.top_k,
+            _document_stats.c.documents.label("document_count"),
+            _document_stats.c.indexed_documents,
+            _document_stats.c.total_chunks,
+        )
+        .join(_document_stats, true())
+        .where(RAGInstance.user_id == id)
+        .order_by(RAGInstance.name, RAGInstance.id)
+        .limit(limit + 1)  # one extra row tells whether there is a next page
+    )
+    if after:
+        query = query.where(tuple_(RAGInstance.name, RAGInstance.id) > tuple_(*after))
+    rows = (await db.execute(query)).mappings().all()
+
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1]["name"], items[-1]["id"]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
 
 @router.get("/get-rag-info/{id}",status_code=status.HTTP_200_OK)
 async def get_rag_info(
     id:UUID=Path(...,title="User id" ,description="User id"),
-    db:Session = Depends(get_db),
-    user:User = Depends(get_current_user)
+    db:AsyncSession = Depends(get_db),
+    user:CurrentUser = Depends(get_current_user)
 ): 
     try:
-        rag= db.query(RAGInstance).filter(RAGInstance.id == id).first()
+        rag= await rag_cache.aget_by_id(db, id)
         
         return rag
     except Exception as e:
@@ -142,15 +320,36 @@ async def get_rag_info(
         return
 
 
+@router.get("/rag/{id}/progress", status_code=status.HTTP_200_OK)
+async def get_indexing_progress(
+    id: UUID = Path(..., title="Rag Id", description="RagId"),
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Live progress, per-stage metrics and ETA of the RAG's current or last indexing run."""
+    rag = await db.scalar(select(RAGInstance).where(RAGInstance.id == id))
+    if not rag:
+        raise HTTPException(404, detail="RAG not found")
+    if rag.user_id != user.id:
+        raise HTTPException(403, detail="Not allowed to view this RAG")
+    documents = (await db.scalars(select(Document).where(Document.rag_id == id).order_by(Document.created_at))).all()
+    try:
+        # Reads task state from the Celery result backend (blocking client)
+        return await asyncio.to_thread(indexing_progress, rag, documents)
+    except Exception as e:
+        print(f"Error occured while reading indexing progress {e}")
+        raise HTTPException(500, detail=f"Failed to read indexing progress: {e}")
+
+
 @router.delete("/delete-rag/{id}",status_code=status.HTTP_201_CREATED)
-def delete_rag(
+async def delete_rag(
     id:UUID=Path(...,title="Rag Id" ,description="RagId"),
-    db:Session=Depends(get_db),
-    user:User = Depends(get_current_user),
+    db:AsyncSession=Depends(get_db),
+    user:CurrentUser = Depends(get_current_user),
    
 ):
     try:
-        rag = db.query(RAGInstance).filter(RAGInstance.id == id).first()
+        rag = await db.scalar(select(RAGInstance).where(RAGInstance.id == id))
         if not rag:
             raise HTTPException(404,detail="Rag not found")
         
@@ -187,28 +386,33 @@ def delete_rag(
         rag_folder_path = f"uploads/{str(rag.id)}"
         if os.path.exists(rag_folder_path):
             try:
-                shutil.rmtree(rag_folder_path)  # Deletes everything inside
+                await asyncio.to_thread(shutil.rmtree, rag_folder_path)  # Deletes everything inside
                 print(f"Deleted RAG folder and all contents: {rag_folder_path}")
             except Exception as e:
                 print(f"Failed to delete RAG folder {rag_folder_path}: {str(e)}")
 
         
-        db.query(Document).filter(Document.rag_id == rag.id).delete()
+        await db.execute(delete(Document).where(Document.rag_id == rag.id))
         
+        qdrant_collection = rag.qdrant_collection
         try:
             qdrant_client = QdrantClient(
                 url=os.getenv("QDRANT_URL", "http://localhost:6333")
             )
-            qdrant_collection = rag.qdrant_collection
-            collections = qdrant_client.get_collections().collections
+            collections = (await asyncio.to_thread(qdrant_client.get_collections)).collections
             if any(col.name == qdrant_collection for col in collections):
-                qdrant_client.delete_collection(collection_name=qdrant_collection)
+                await asyncio.to_thread(qdrant_client.delete_collection, collection_name=qdrant_collection)
                 print(f"Deleted Qdrant collection: {qdrant_collection}")
         except Exception as e:
             print(f"Failed to delete the rag with collection {qdrant_collection}")        
+        # Caches go regardless of whether Qdrant answered; both calls block (valkey, Qdrant HTTP)
+        await asyncio.to_thread(invalidate_collection, qdrant_collection)
+        await asyncio.to_thread(answer_cache.clear, qdrant_collection)
+        forget_profile(rag.id)
                 
-        db.delete(rag)
-        db.commit()
+        await db.delete(rag)
+        await db.commit()
+        await rag_cache.aforget(id, rag.qdrant_collection)
         return {
             "message": "RAG instance deleted successfully",
             "deleted_id": str(id),
@@ -219,11 +423,120 @@ def delete_rag(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f'Error deleting RAG: {str(e)}')
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete RAG instance: {str(e)}"
         )
-    
-        
\ No newline at end of file
+
+
+@router.post("/rag/{id}/documents", status_code=status.HTTP_202_ACCEPTED)
+async def add_documents(
+    id: UUID = Path(..., title="Rag Id", description="RagId"),
+    documents: List[UploadFile] = File(..., min_length=1, max_length=MAX_DOCUMENTS_PER_UPLOAD),
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Add or replace documents on an existing RAG. A file whose content is already
+    indexed is skipped; a file with the name of an existing document but new
+    content replaces that document. Only the new or changed files are indexed.
+    """
+    rag = await db.scalar(select(RAGInstance).where(RAGInstance.id == id))
+    if not rag:
+        raise HTTPException(404, detail="Rag not found")
+    if rag.user_id != user.id:
+        raise HTTPException(403, detail="Not allowed to modify this RAG")
+    _check_extensions(documents)
+    _check_sizes(documents)
+
+    existing = (await db.scalars(select(Document).where(Document.rag_id == rag.id))).all()
+    by_path = {d.file_path: d for d in existing}
+    # A failed document is retried when its file is uploaded again
+    known_hashes = {d.content_hash for d in existing if d.content_hash and d.status != StatusEnum.FAILED.value}
+
+    upload_dir = f"uploads/{rag.id}"
+    # Receive every file before moving any into place: a 413 on a later file must not
+    # leave earlier documents' files overwritten under rows that still describe the old ones
+    received = []
+    try:
+        for doc in documents:
+            received.append((doc.filename, *await _receive_upload(doc, upload_dir)))
+    except HTTPException:
+        for _, tmp_path, _, _ in received:
+            await asyncio.to_thread(os.remove, tmp_path)
+        raise
+
+    added, updated, skipped = [], [], []
+    for filename, tmp_path, content_hash, size in received:
+        if content_hash in known_hashes:
+            await asyncio.to_thread(os.remove, tmp_path)
+            skipped.append(filename)
+            continue
+        known_hashes.add(content_hash)
+        current = by_path.get(os.path.join(upload_dir, os.path.basename(filename)))
+        document = await _save_document(db, rag, user.id, filename, tmp_path, size, content_hash, current)
+        # Two files with one name in the same request: the last one wins, as one document
+        by_path[document.file_path] = document
+        if current is None:
+            added.append(document)
+        elif document not in added and document not in updated:
+            updated.append(document)
+
+    to_index = added + updated
+    if to_index:
+        await db.flush()
+        document_ids = [str(d.id) for d in to_index]
+        rag.document_count = len(existing) + len(added)
+        await db.commit()
+        await rag_cache.astore(rag)
+        rag_indexing_task.delay(str(rag.id), qdrant_collection=rag.qdrant_collection, document_ids=document_ids)
+
+    return {
+        "id": rag.id,
+        "added": [d.filename for d in added],
+        "updated": [d.filename for d in updated],
+        "skipped": skipped,
+        "message": f"Indexing {len(to_index)} document(s)" if to_index else "No new or changed documents",
+    }
+
+
+@router.delete("/rag/{id}/documents/{document_id}", status_code=status.HTTP_200_OK)
+async def delete_document(
+    id: UUID = Path(..., title="Rag Id", description="RagId"),
+    document_id: UUID = Path(..., title="Document Id", description="DocumentId"),
+    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    rag = await db.scalar(select(RAGInstance).where(RAGInstance.id == id))
+    if not rag:
+        raise HTTPException(404, detail="Rag not found")
+    if rag.user_id != user.id:
+        raise HTTPException(403, detail="Not allowed to modify this RAG")
+    document = await db.scalar(select(Document).where(Document.id == document_id, Document.rag_id == rag.id))
+    if not document:
+        raise HTTPException(404, detail="Document not found")
+
+    try:
+        removed = await asyncio.to_thread(delete_document_points, rag.qdrant_collection, document)
+    except Exception as e:
+        raise HTTPException(500, detail=f"Failed to delete the document's vectors: {e}")
+    await asyncio.to_thread(invalidate_collection, rag.qdrant_collection)
+    await asyncio.to_thread(answer_cache.clear, rag.qdrant_collection)
+
+    if document.file_path and os.path.exists(document.file_path):
+        try:
+            await asyncio.to_thread(os.remove, document.file_path)
+        except OSError as e:
+            print(f"Failed to delete the doc {document.file_path}: {e}")
+
+    await db.delete(document)
+    rag.document_count = max(0, (rag.document_count or 1) - 1)
+    await db.commit()
+    await rag_cache.astore(rag)
+    return {
+        "message": "Document deleted successfully",
+        "deleted_id": str(document_id),
+        "points_deleted": removed,
+    }
@@ -6,10 +6,19 @@ class RagCreate(BaseModel):
     description: Optional[str] = None
     qdrant_collection: str = Field(max_length=50)
     embedding_model: str = "text-embedding-3-large"
+    embedding_dimensions: Optional[int] = Field(default=None, gt=0)
     llm_model: str = "gpt-4o-mini"
     chunk_size: int = Field(gt=0, default=1000)
     chunk_overlap: int = Field(ge=0, default=400)
     top_k: int = Field(gt=0, default=5)
+    score_threshold: Optional[float] = Field(default=None, ge=-1, le=1)
+    mmr_lambda: Optional[float] = Field(default=None, ge=0, le=1)
+    context_token_budget: Optional[int] = Field(default=None, gt=0)
+    vector_quantization: str = "scalar"
+    vectors_on_disk: bool = True
+    hnsw_m: int = Field(ge=0, default=16)
+    hnsw_ef_construct: int = Field(ge=4, default=100)
+    sparse_vectors: bool = True
     document_count: int = Field(ge=0, default=0)
     is_active: bool = True
 
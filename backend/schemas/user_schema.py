@@ -23,10 +23,28 @@ class UserResponse(BaseModel):
 class AskRequest(BaseModel):
     query: str = Field(..., min_length=1, description="User query text")
     collection_name : str = Field(...,min_length=1,description="Rag collection name")
-    embedding : str = Field(...,min_length=1,description="Embeddings model used")
+    embedding : Optional[str] = Field(None, description="Ignored; the RAG's own embedding model is used")
+    mode: Optional[str] = Field(None, description="dense, sparse, hybrid or auto (default auto)")
 
 class AskResponse(BaseModel):
     answer: str
     citations: list[dict] = []
     used_k: int = 0
-        
\ No newline at end of file
+    context_tokens: int = 0
+    context_tokens_saved: int = 0
+        
+
+class AskBatchRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1, description="User queries, answered independently")
+    collection_name : str = Field(...,min_length=1,description="Rag collection name")
+    embedding : Optional[str] = Field(None, description="Ignored; the RAG's own embedding model is used")
+    concurrency: Optional[int] = Field(None, gt=0, description="Max chat completions in flight")
+    stream: bool = Field(False, description="Stream NDJSON lines as answers finish instead of one ordered list")
+    mode: Optional[str] = Field(None, description="dense, sparse, hybrid or auto (default auto), applied per query")
+
+class AskBatchItem(AskResponse):
+    index: int
+    error: Optional[str] = None
+
+class AskBatchResponse(BaseModel):
+    answers: list[AskBatchItem]
@@ -25,25 +25,58 @@ export  type RagProps = {
     document_count: number;
     top_k: number;
     qdrant_collection: string;
+    // Only in get-user-rags pages
+    indexed_documents?: number;
+    total_chunks?: number;
  
 }
+type RagPage = {
+  items: RagProps[];
+  next_cursor: string | null;
+};
+const PAGE_SIZE = 50;
 export default function Dashboard() {
   const { user, loading } = useAuth() as { user: User | null; loading: boolean };
   const [ragData, setRagData] = useState<RagProps[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const router = useRouter()
+
+  const fetchPage = async (userId: string, cursor: string | null) => {
+    const res = await api.get<RagPage>(`/api/v1/user/get-user-rags/${userId}`, {
+      params: { limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+    });
+    return res.data;
+  };
+
   useEffect(() => {
     if (!user?.id) return; // Prevent API call until user.id is defined
 
     (async () => {
       try {
-        const res = await api.get(`/api/v1/user/get-user-rags/${user.id}`);
-        setRagData(res.data)
+        const page = await fetchPage(user.id, null);
+        setRagData(page.items)
+        setNextCursor(page.next_cursor)
       } catch (error) {
         console.error("Error fetching rags:", error);
       }
     })();
   }, [user?.id]);
 
+  const loadMore = async () => {
+    if (!user?.id || !nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(user.id, nextCursor);
+      setRagData((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error("Error fetching rags:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="flex min-h-[50vh] items-center justify-center">
@@ -69,6 +102,17 @@ export default function Dashboard() {
           ))}
         </div>
 
+        {nextCursor && (
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="mt-5 w-full rounded-lg border border-zinc-800 px-4 py-2 text-sm text-zinc-400 transition hover:border-zinc-700 hover:text-white disabled:opacity-50"
+          >
+            {loadingMore ? "Loading…" : "Load more"}
+          </button>
+        )}
+
         {ragData.length === 0 && (
           <div className="rounded-xl border border-zinc-800 bg-zinc-900/50 px-5 py-10 text-center">
             <p className="text-sm text-zinc-500">No RAGs yet.</p>
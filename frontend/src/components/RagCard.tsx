@@ -73,7 +73,8 @@ export default function RagCard({ rag }: RagCardProps) {
             {rag.status}
           </span>
           <span className="text-xs text-zinc-500">
-            {rag.document_count} doc{rag.document_count !== 1 ? "s" : ""} · top-{rag.top_k}
+            {rag.document_count} doc{rag.document_count !== 1 ? "s" : ""}
+            {rag.total_chunks !== undefined && ` · ${rag.total_chunks} chunks`} · top-{rag.top_k}
           </span>
           <span className="text-xs text-zinc-600">
             {rag.embedding_model}